@@ -1,32 +1,49 @@
 from fastapi import APIRouter
 
-from app.api import auth
+_api_router = None
 
-api_router = APIRouter()
 
-# Always available
-api_router.include_router(
-    auth.router,
-    prefix="/api",
-    tags=["Authentication"]
-)
+def _build_api_router() -> APIRouter:
+    from app.api import auth
 
-# Optional APIs (wrap in try-except if not always available)
-try:
-    from app.api import shareholders, issuances
+    router = APIRouter()
 
-    api_router.include_router(
-        shareholders.router,
-        prefix="/api/shareholders",
-        tags=["Shareholders"]
+    # Always available
+    router.include_router(
+        auth.router,
+        prefix="/api",
+        tags=["Authentication"]
     )
 
-    api_router.include_router(
-        issuances.router,
-        prefix="/api/issuances",
-        tags=["Issuances"]
-    )
+    # Optional APIs (wrap in try-except if not always available)
+    try:
+        from app.api import shareholders, issuances
+
+        router.include_router(
+            shareholders.router,
+            prefix="/api/shareholders",
+            tags=["Shareholders"]
+        )
+
+        router.include_router(
+            issuances.router,
+            prefix="/api/issuances",
+            tags=["Issuances"]
+        )
+
+    except ImportError as e:
+        import logging
+        logging.warning(f"Optional API routes not loaded: {e}")
+
+    return router
+
 
-except ImportError as e:
-    import logging
-    logging.warning(f"Optional API routes not loaded: {e}")
+def __getattr__(name):
+    # Built on first access only: include_router copies and re-analyses every route,
+    # and app.main mounts the routers directly, so importing app.api must not pay for it
+    global _api_router
+    if name == "api_router":
+        if _api_router is None:
+            _api_router = _build_api_router()
+        return _api_router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
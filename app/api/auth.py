@@ -1,19 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, status, Request
+from sqlalchemy.exc import OperationalError
 
-from app.api.deps import get_client_ip
-from app.database import get_db
+from app.api.deps import AuthServiceDep, get_client_ip
 from app.schemas.user import UserLogin, Token
-from app.services.auth import AuthService
 
 router = APIRouter()
 
 
 @router.post("/token", response_model=Token, summary="User Login")
-async def login_for_access_token(
+def login_for_access_token(
         login_data: UserLogin,
         request: Request,
-        db: Session = Depends(get_db)
+        auth_service: AuthServiceDep
 ) -> Token:
     """
     Authenticate user and return JWT access token.
@@ -24,31 +22,26 @@ async def login_for_access_token(
     **Args:**
         login_data: User credentials (email and password)
         request: HTTP request object for IP logging
-        db: Database session
+        auth_service: Authentication service
 
     Returns:
         JWT token with expiration information
 
     Raises:
-        HTTPException: 401 if credentials are invalid
+        HTTPException: 401 if credentials are invalid, 503 if the database is unavailable
     """
     # Extract client IP for audit logging
     client_ip = get_client_ip(request)
 
-    # Initialize authentication service
-    auth_service = AuthService(db)
-
     try:
         # Authenticate user and generate token
         token = auth_service.authenticate_user(login_data, client_ip)
         return token
 
-    except HTTPException as e:
-        raise e
-
-    except Exception as e:
-        # Handle unexpected errors
+    except OperationalError:
+        # Connection-level failure (e.g. pool exhausted) - transient, tell the client to retry
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Authentication service error"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database temporarily unavailable",
+            headers={"Retry-After": "1"},
         )
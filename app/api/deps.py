@@ -1,13 +1,37 @@
+import hashlib
+import threading
+import time
+from typing import Annotated
+
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.database import get_db
 from app.models.user import UserRole
+from app.services.audit import AuditService
 from app.services.auth import AuthService
+from app.services.issuance import ShareIssuanceService
+from app.services.pdf import PDFService
+from app.services.shareholder import ShareholderService
+from app.utils.security import get_token_expiry
 
 security = HTTPBearer()
 
+# Short-lived cache of validated tokens to skip JWT verification and the user lookup.
+# Keyed by a 16-byte BLAKE2b digest of the token - the raw token is never stored.
+# Values are (user dict, expires_at) where expires_at never exceeds the token's own exp.
+_token_cache = TTLCache(maxsize=10000, ttl=settings.token_cache_ttl_seconds)
+_token_cache_lock = threading.Lock()
+
+
+def _token_cache_key(token: str) -> bytes:
+    """Build the cache key for a bearer token"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 
 def get_client_ip(request: Request) -> str:
     """
@@ -20,125 +44,188 @@ def get_client_ip(request: Request) -> str:
     Returns:
         Client IP address string
     """
+    # Single pass over the raw ASGI headers (names are already lowercase bytes)
+    forwarded_for = real_ip = None
+    for name, value in request.scope["headers"]:
+        if name == b"x-forwarded-for":
+            forwarded_for = value
+            break  # Takes precedence, nothing else to look for
+        if name == b"x-real-ip" and real_ip is None:
+            real_ip = value
+
     # Check for forwarded headers (proxy/load balancer)
-    forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
         # X-Forwarded-For can contain multiple IPs, take the first one
-        return forwarded_for.split(",")[0].strip()
+        return forwarded_for.split(b",", 1)[0].strip().decode("latin-1")
 
     # Check for real IP header
-    real_ip = request.headers.get("X-Real-IP")
     if real_ip:
-        return real_ip
+        return real_ip.decode("latin-1")
 
     # Fall back to direct client IP
     return request.client.host
 
 
-def get_current_user(
-        request: Request,
-        credentials: HTTPAuthorizationCredentials = Depends(security),
-        db: Session = Depends(get_db)
-) -> dict:
+# Request-scoped database session for the service providers below
+DBSession = Annotated[Session, Depends(get_db)]
+
+
+# Service providers - FastAPI caches each dependency per request,
+# so a service is built at most once even when several dependants need it
+
+def get_auth_service(db: DBSession) -> AuthService:
+    """Provide the authentication service for the current request"""
+    return AuthService(db)
+
+
+def get_audit_service(db: DBSession) -> AuditService:
+    """Provide the audit service for the current request"""
+    return AuditService(db)
+
+
+def get_issuance_service(db: DBSession) -> ShareIssuanceService:
+    """Provide the share issuance service for the current request"""
+    return ShareIssuanceService(db)
+
+
+def get_pdf_service(db: DBSession) -> PDFService:
+    """Provide the PDF certificate service for the current request"""
+    return PDFService(db)
+
+
+def get_shareholder_service(db: DBSession) -> ShareholderService:
+    """Provide the shareholder service for the current request"""
+    return ShareholderService(db)
+
+
+def _authenticate(request: Request, token: str, db: Session) -> dict:
     """
-    Dependency to get current authenticated user.
-    Validates JWT token and returns user information.
+    Validate a bearer token and build the user context for the request.
+    Validated tokens are cached briefly to avoid re-verifying on every request.
 
     Args:
         request: FastAPI request object for IP extraction
-        credentials: HTTP Bearer credentials
-        db: Database session
+        token: Raw bearer token
+        db: Database session, only used on a cache miss
 
     Returns:
-        Current user dictionary
+        Current user dictionary including the client IP
 
     Raises:
-        HTTPException: If authentication fails
+        HTTPException: If authentication fails, 503 if the database is unavailable
     """
-    auth_service = AuthService(db)
-
     # Extract client IP for audit logging
     client_ip = get_client_ip(request)
 
+    # Serve recently validated tokens from cache; the IP is per request and never cached
+    cache_key = _token_cache_key(token)
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+    if cached is not None and cached[1] > time.time():
+        return {**cached[0], "ip_address": client_ip}
+
+    auth_service = AuthService(db)
+
     try:
-        user = auth_service.get_current_user_from_token(credentials.credentials)
-        # Add IP address to user context for audit logging
-        user["ip_address"] = client_ip
-        return user
-    except HTTPException:
-        raise
-    except Exception as e:
+        user = auth_service.get_current_user_from_token(token)
+    except OperationalError:
+        # Connection-level failure (e.g. pool exhausted) - transient, tell the client to retry
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database temporarily unavailable",
+            headers={"Retry-After": "1"},
         )
 
+    # Only successful validations are cached, and never beyond the token's expiration
+    token_exp = get_token_expiry(token)
+    if token_exp is not None:
+        expires_at = min(time.time() + settings.token_cache_ttl_seconds, token_exp)
+        with _token_cache_lock:
+            _token_cache[cache_key] = (dict(user), expires_at)
+
+    # Add IP address to user context for audit logging
+    user["ip_address"] = client_ip
+    return user
 
-def get_current_active_user(
-        current_user: dict = Depends(get_current_user)
+
+def get_current_user(
+        request: Request,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: Session = Depends(get_db)
 ) -> dict:
     """
-    Dependency to ensure user is active.
+    Dependency to get current authenticated user.
+    Validates JWT token and returns user information.
 
     Args:
-        current_user: Current user from get_current_user
+        request: FastAPI request object for IP extraction
+        credentials: HTTP Bearer credentials
+        db: Database session
 
     Returns:
-        Active user dictionary
+        Current user dictionary
 
     Raises:
-        HTTPException: If user is inactive
+        HTTPException: If authentication fails
     """
-    if not current_user.get("is_active", False):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Inactive user"
-        )
-    return current_user
+    return _authenticate(request, credentials.credentials, db)
 
 
-def get_admin_user(
-        current_user: dict = Depends(get_current_active_user)
-) -> dict:
+def require_role(*roles: UserRole, detail: str = "Not enough permissions"):
     """
-    Dependency to ensure user has admin privileges.
+    Build a dependency that authenticates the user and checks that the account
+    is active and, when roles are given, holds one of them.
+    Everything runs in a single dependency instead of a chain of nested ones.
 
     Args:
-        current_user: Current active user
+        roles: Accepted user roles - any role is accepted when empty
+        detail: Error message returned when the role check fails
 
     Returns:
-        Admin user dictionary
-
-    Raises:
-        HTTPException: If user is not admin
+        FastAPI dependency returning the current user dictionary
     """
-    if current_user.get("role") != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions. Admin access required."
-        )
-    return current_user
 
+    def dependency(
+            request: Request,
+            credentials: HTTPAuthorizationCredentials = Depends(security),
+            db: Session = Depends(get_db)
+    ) -> dict:
+        current_user = _authenticate(request, credentials.credentials, db)
 
-def get_shareholder_user(
-        current_user: dict = Depends(get_current_active_user)
-) -> dict:
-    """
-    Dependency to ensure user is a shareholder.
+        if not current_user.get("is_active", False):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Inactive user"
+            )
 
-    Args:
-        current_user: Current active user
+        if roles and current_user.get("role") not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=detail
+            )
 
-    Returns:
-        Shareholder user dictionary
+        return current_user
 
-    Raises:
-        HTTPException: If user is not shareholder
-    """
-    if current_user.get("role") != UserRole.SHAREHOLDER:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Shareholder access required"
-        )
-    return current_user
+    return dependency
+
+
+# Dependency to ensure user is active
+get_current_active_user = require_role()
+
+# Dependency to ensure user has admin privileges
+get_admin_user = require_role(UserRole.ADMIN, detail="Not enough permissions. Admin access required.")
+
+# Dependency to ensure user is a shareholder
+get_shareholder_user = require_role(UserRole.SHAREHOLDER, detail="Shareholder access required")
+
+
+# Annotated dependency aliases shared by the route handlers
+CurrentUser = Annotated[dict, Depends(get_current_active_user)]
+AdminUser = Annotated[dict, Depends(get_admin_user)]
+ShareholderUser = Annotated[dict, Depends(get_shareholder_user)]
+
+AuthServiceDep = Annotated[AuthService, Depends(get_auth_service)]
+AuditServiceDep = Annotated[AuditService, Depends(get_audit_service)]
+IssuanceServiceDep = Annotated[ShareIssuanceService, Depends(get_issuance_service)]
+PDFServiceDep = Annotated[PDFService, Depends(get_pdf_service)]
+ShareholderServiceDep = Annotated[ShareholderService, Depends(get_shareholder_service)]
@@ -1,27 +1,64 @@
 # Share issuance API endpoints
 # Handles share issuance operations and certificate generation
+# Handlers are plain `def`: the session is synchronous, so FastAPI runs them in its threadpool
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, HTTPException, Query, status, Request, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
 
-from app.api.deps import get_admin_user, get_current_active_user, get_client_ip
-from app.database import get_db
-from app.schemas.shareholder import ShareIssuanceCreate, ShareIssuanceResponse
-from app.services.audit import AuditService
-from app.services.issuance import ShareIssuanceService
-from app.services.pdf import PDFService
+from app.api.deps import (
+    AdminUser,
+    AuditServiceDep,
+    CurrentUser,
+    IssuanceServiceDep,
+    PDFServiceDep,
+    get_client_ip
+)
+from app.schemas.shareholder import ShareIssuanceBulkCreate, ShareIssuanceCreate, ShareIssuanceResponse
+from app.services.pdf import CERTIFICATE_TEMPLATE_VERSION
 
 router = APIRouter()
 
+# Issuances are immutable, so their details and certificates can be cached client-side.
+# Responses are per user (bearer auth), hence `private` - shared caches must not store them.
+ISSUANCE_CACHE_CONTROL = "private, max-age=60"
+CERTIFICATE_CACHE_CONTROL = "private, max-age=86400, immutable"
+
+
+def _issuance_etag(issuance: ShareIssuanceResponse) -> str:
+    """Build the validator for an issuance - (id, creation time) never changes"""
+    return f'W/"{issuance.id}-{int(issuance.created_at.timestamp())}"'
+
+
+def _certificate_etag(issuance: ShareIssuanceResponse) -> str:
+    """
+    Build the validator for a rendered certificate.
+    Includes the template version so a layout change stops old copies revalidating
+    (browsers still reuse them until CERTIFICATE_CACHE_CONTROL's max-age runs out).
+    """
+    return f'W/"{issuance.id}-{int(issuance.created_at.timestamp())}-v{CERTIFICATE_TEMPLATE_VERSION}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag using weak comparison"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
 
 @router.get("/", response_model=List[ShareIssuanceResponse], summary="Get Share Issuances")
-async def get_issuances(
+def get_issuances(
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_current_active_user)
+        issuance_service: IssuanceServiceDep,
+        audit_service: AuditServiceDep,
+        current_user: CurrentUser,
+        skip: int = Query(0, ge=0, description="Number of issuances to skip"),
+        limit: int = Query(50, ge=1, le=200, description="Maximum number of issuances to return")
 ) -> List[ShareIssuanceResponse]:
     """
     Get share issuances based on user role.
@@ -33,20 +70,22 @@ async def get_issuances(
     **Performance Notes:**
     - Uses optimized queries with joined loading
     - Results ordered by most recent first
+    - Paginated in SQL with skip/limit
 
     Args:
         request: HTTP request object
-        db: Database session
+        issuance_service: Share issuance service
+        audit_service: Audit service
         current_user: Current authenticated user
+        skip: Number of issuances to skip
+        limit: Maximum number of issuances to return
 
     Returns:
         List of share issuances based on user permissions
     """
-    issuance_service = ShareIssuanceService(db)
-    audit_service = AuditService(db)
     client_ip = get_client_ip(request)
 
-    # Log dashboard access
+    # Log dashboard access (queued, written in the background)
     dashboard_type = f"{current_user['role']}_issuances"
     audit_service.log_dashboard_access(
         user_id=current_user["id"],
@@ -56,18 +95,18 @@ async def get_issuances(
 
     if current_user["role"] == "admin":
         # Admin sees all issuances
-        return issuance_service.get_all_issuances()
+        return issuance_service.get_all_issuances(skip=skip, limit=limit)
     else:
         # Shareholder sees only their own issuances
-        return issuance_service.get_issuances_by_user(current_user["id"])
+        return issuance_service.get_issuances_by_user(current_user["id"], skip=skip, limit=limit)
 
 
 @router.post("/", response_model=ShareIssuanceResponse, summary="Create Share Issuance")
-async def create_share_issuance(
+def create_share_issuance(
         issuance_data: ShareIssuanceCreate,
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_admin_user)
+        issuance_service: IssuanceServiceDep,
+        current_user: AdminUser
 ) -> ShareIssuanceResponse:
     """
     Create new share issuance for a shareholder.
@@ -92,7 +131,7 @@ async def create_share_issuance(
     Args:
         issuance_data: Share issuance data
         request: HTTP request object
-        db: Database session
+        issuance_service: Share issuance service
         current_user: Current authenticated admin user
 
     Returns:
@@ -101,7 +140,6 @@ async def create_share_issuance(
     Raises:
         HTTPException: 400 for validation errors, 404 if shareholder not found
     """
-    issuance_service = ShareIssuanceService(db)
     client_ip = get_client_ip(request)
 
     try:
@@ -126,11 +164,62 @@ async def create_share_issuance(
         )
 
 
+@router.post("/bulk", response_model=List[ShareIssuanceResponse], summary="Create Share Issuances in Bulk")
+def create_share_issuances_bulk(
+        bulk_data: ShareIssuanceBulkCreate,
+        request: Request,
+        issuance_service: IssuanceServiceDep,
+        current_user: AdminUser
+) -> List[ShareIssuanceResponse]:
+    """
+    Create up to 1,000 share issuances in one request.
+
+    **Admin Only Endpoint**
+
+    Applies the same validation rules as single issuance creation. The batch is
+    all-or-nothing: if any issuance is invalid, none is created. Certificate
+    numbers, issuance rows and audit events are each written with one statement.
+
+    Args:
+        bulk_data: Share issuances to create
+        request: HTTP request object
+        issuance_service: Share issuance service
+        current_user: Current authenticated admin user
+
+    Returns:
+        Created share issuances with certificate numbers, in input order
+
+    Raises:
+        HTTPException: 400 for validation errors, 404 if a shareholder is not found
+    """
+    client_ip = get_client_ip(request)
+
+    try:
+        return issuance_service.create_share_issuances_bulk(
+            bulk_data=bulk_data,
+            issued_by_user_id=current_user["id"],
+            ip_address=client_ip
+        )
+
+    except HTTPException as e:
+        # Re-raise HTTP exceptions from service layer
+        raise e
+
+    except Exception as e:
+        # Handle unexpected errors
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create share issuances"
+        )
+
+
 @router.get("/{issuance_id}", response_model=ShareIssuanceResponse, summary="Get Issuance Details")
-async def get_issuance(
+def get_issuance(
         issuance_id: int,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_current_active_user)
+        request: Request,
+        response: Response,
+        issuance_service: IssuanceServiceDep,
+        current_user: CurrentUser
 ) -> ShareIssuanceResponse:
     """
     Get detailed information about a specific share issuance.
@@ -139,19 +228,21 @@ async def get_issuance(
     - Admins can access any issuance
     - Shareholders can only access their own issuances
 
+    **Caching:** responses carry an ETag; a matching If-None-Match returns 304.
+
     Args:
         issuance_id: Share issuance ID
-        db: Database session
+        request: HTTP request object
+        response: Response used to set caching headers
+        issuance_service: Share issuance service
         current_user: Current authenticated user
 
     Returns:
-        Detailed share issuance information
+        Detailed share issuance information, or 304 if the client copy is current
 
     Raises:
         HTTPException: 404 if not found, 403 if access denied
     """
-    issuance_service = ShareIssuanceService(db)
-
     # Get issuance with role-based access control
     issuance = issuance_service.get_issuance_details(
         issuance_id=issuance_id,
@@ -165,15 +256,23 @@ async def get_issuance(
             detail="Share issuance not found or access denied"
         )
 
+    etag = _issuance_etag(issuance)
+    cache_headers = {"ETag": etag, "Cache-Control": ISSUANCE_CACHE_CONTROL}
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    response.headers.update(cache_headers)
     return issuance
 
 
 @router.get("/{issuance_id}/certificate", summary="Download Share Certificate")
-async def download_certificate(
+def download_certificate(
         issuance_id: int,
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_current_active_user)
+        issuance_service: IssuanceServiceDep,
+        pdf_service: PDFServiceDep,
+        audit_service: AuditServiceDep,
+        current_user: CurrentUser
 ):
     """
     Generate and download PDF share certificate.
@@ -192,18 +291,17 @@ async def download_certificate(
     Args:
         issuance_id: Share issuance ID
         request: HTTP request object
-        db: Database session
+        issuance_service: Share issuance service
+        pdf_service: PDF certificate service
+        audit_service: Audit service
         current_user: Current authenticated user
 
     Returns:
-        PDF file as streaming response
+        PDF file as streaming response, or 304 if the client copy is current
 
     Raises:
         HTTPException: 404 if not found, 403 if access denied
     """
-    issuance_service = ShareIssuanceService(db)
-    pdf_service = PDFService(db)
-    audit_service = AuditService(db)
     client_ip = get_client_ip(request)
 
     # Verify access to issuance
@@ -219,6 +317,20 @@ async def download_certificate(
             detail="Share issuance not found or access denied"
         )
 
+    # Log certificate download for audit trail (queued, written in the background)
+    # (also when the client reuses its cached copy)
+    audit_service.log_certificate_download(
+        issuance_id=issuance_id,
+        user_id=current_user["id"],
+        ip_address=client_ip
+    )
+
+    # Certificate content only changes with the template - skip rendering if the client already has it
+    etag = _certificate_etag(issuance)
+    cache_headers = {"ETag": etag, "Cache-Control": CERTIFICATE_CACHE_CONTROL}
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
     # Generate PDF certificate
     pdf_buffer = pdf_service.generate_share_certificate(issuance_id)
 
@@ -228,33 +340,28 @@ async def download_certificate(
             detail="Failed to generate certificate PDF"
         )
 
-    # Log certificate download for audit trail
-    audit_service.log_certificate_download(
-        issuance_id=issuance_id,
-        user_id=current_user["id"],
-        ip_address=client_ip
-    )
-
     # Create filename with certificate number
     filename = f"share_certificate_{issuance.certificate_number}.pdf"
 
     # Return PDF as streaming response
     return StreamingResponse(
-        pdf_buffer,
+        pdf_service.iter_certificate_chunks(pdf_buffer),
         media_type="application/pdf",
         headers={
             "Content-Disposition": f"attachment; filename={filename}",
-            "Content-Type": "application/pdf"
+            "Content-Type": "application/pdf",
+            **cache_headers
         }
     )
 
 
 @router.get("/{issuance_id}/preview", summary="Preview Share Certificate")
-async def preview_certificate(
+def preview_certificate(
         issuance_id: int,
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_current_active_user)
+        issuance_service: IssuanceServiceDep,
+        pdf_service: PDFServiceDep,
+        current_user: CurrentUser
 ):
     """
     Preview PDF share certificate in browser.
@@ -264,15 +371,13 @@ async def preview_certificate(
     Args:
         issuance_id: Share issuance ID
         request: HTTP request object
-        db: Database session
+        issuance_service: Share issuance service
+        pdf_service: PDF certificate service
         current_user: Current authenticated user
 
     Returns:
-        PDF file for inline browser display
+        PDF file for inline browser display, or 304 if the client copy is current
     """
-    issuance_service = ShareIssuanceService(db)
-    pdf_service = PDFService(db)
-    client_ip = get_client_ip(request)
 
     # Verify access to issuance
     issuance = issuance_service.get_issuance_details(
@@ -287,6 +392,12 @@ async def preview_certificate(
             detail="Share issuance not found or access denied"
         )
 
+    # Certificate content only changes with the template - skip rendering if the client already has it
+    etag = _certificate_etag(issuance)
+    cache_headers = {"ETag": etag, "Cache-Control": CERTIFICATE_CACHE_CONTROL}
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
     # Generate PDF certificate
     pdf_buffer = pdf_service.generate_share_certificate(issuance_id)
 
@@ -298,10 +409,11 @@ async def preview_certificate(
 
     # Return PDF for inline display
     return StreamingResponse(
-        pdf_buffer,
+        pdf_service.iter_certificate_chunks(pdf_buffer),
         media_type="application/pdf",
         headers={
             "Content-Disposition": "inline",
-            "Content-Type": "application/pdf"
+            "Content-Type": "application/pdf",
+            **cache_headers
         }
     )
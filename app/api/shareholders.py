@@ -1,29 +1,35 @@
 # Shareholder API endpoints
 # Handles all shareholder-related operations with proper authorization
+# Handlers are plain `def`: the session is synchronous, so FastAPI runs them in its threadpool
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query, status, Request
 
-from app.api.deps import get_admin_user, get_current_active_user, get_client_ip
-from app.database import get_db
+from app.api.deps import (
+    AdminUser,
+    AuditServiceDep,
+    CurrentUser,
+    ShareholderServiceDep,
+    get_client_ip
+)
 from app.schemas.shareholder import (
     ShareholderProfileCreate,
     ShareholderProfileResponse,
     ShareholderSummary
 )
-from app.services.audit import AuditService
-from app.services.shareholder import ShareholderService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[ShareholderSummary], summary="Get All Shareholders")
-async def get_shareholders(
+def get_shareholders(
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_admin_user)
+        shareholder_service: ShareholderServiceDep,
+        audit_service: AuditServiceDep,
+        current_user: AdminUser,
+        skip: int = Query(0, ge=0, description="Number of shareholders to skip"),
+        limit: int = Query(50, ge=1, le=200, description="Maximum number of shareholders to return")
 ) -> List[ShareholderSummary]:
     """
     Get list of all shareholders with summary information.
@@ -36,21 +42,21 @@ async def get_shareholders(
     - Total investment value
     - Number of share issuances
 
-    This endpoint is optimized with a single database query to prevent N+1 problems.
+    This endpoint is optimized with a single database query to prevent N+1 problems,
+    paginated in SQL with skip/limit.
 
     Args:
         request: HTTP request object
-        db: Database session
+        shareholder_service: Shareholder service
+        audit_service: Audit service
         current_user: Current authenticated admin user
+        skip: Number of shareholders to skip
+        limit: Maximum number of shareholders to return
 
     Returns:
         List of shareholder summaries sorted by total shares (descending)
     """
-    # Initialize services
-    shareholder_service = ShareholderService(db)
-    audit_service = AuditService(db)
-
-    # Log dashboard access for security monitoring
+    # Log dashboard access for security monitoring (queued, written in the background)
     client_ip = get_client_ip(request)
     audit_service.log_dashboard_access(
         user_id=current_user["id"],
@@ -59,17 +65,17 @@ async def get_shareholders(
     )
 
     # Get all shareholders with calculated totals
-    shareholders = shareholder_service.get_all_shareholders_summary()
+    shareholders = shareholder_service.get_all_shareholders_summary(skip=skip, limit=limit)
 
     return shareholders
 
 
 @router.post("/", response_model=ShareholderProfileResponse, summary="Create New Shareholder")
-async def create_shareholder(
+def create_shareholder(
         shareholder_data: ShareholderProfileCreate,
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_admin_user)
+        shareholder_service: ShareholderServiceDep,
+        current_user: AdminUser
 ) -> ShareholderProfileResponse:
     """
     Create new shareholder with associated user account.
@@ -91,7 +97,7 @@ async def create_shareholder(
     Args:
         shareholder_data: Shareholder creation data
         request: HTTP request object
-        db: Database session
+        shareholder_service: Shareholder service
         current_user: Current authenticated admin user
 
     Returns:
@@ -100,7 +106,6 @@ async def create_shareholder(
     Raises:
         HTTPException: 400 if email already exists or validation fails
     """
-    shareholder_service = ShareholderService(db)
     client_ip = get_client_ip(request)
 
     try:
@@ -126,10 +131,10 @@ async def create_shareholder(
 
 
 @router.get("/{shareholder_id}", response_model=ShareholderProfileResponse, summary="Get Shareholder Details")
-async def get_shareholder(
+def get_shareholder(
         shareholder_id: int,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_current_active_user)
+        shareholder_service: ShareholderServiceDep,
+        current_user: CurrentUser
 ) -> ShareholderProfileResponse:
     """
     Get detailed shareholder information including all share issuances.
@@ -140,43 +145,36 @@ async def get_shareholder(
 
     Args:
         shareholder_id: Shareholder ID
-        db: Database session
+        shareholder_service: Shareholder service
         current_user: Current authenticated user
 
     Returns:
         Detailed shareholder profile with issuances
 
     Raises:
-        HTTPException: 404 if shareholder not found, 403 if access denied
+        HTTPException: 404 if shareholder not found or access denied
     """
-    shareholder_service = ShareholderService(db)
-
-    # Get shareholder details
-    shareholder = shareholder_service.get_shareholder_details(shareholder_id)
+    # Get shareholder details with role-based access control
+    shareholder = shareholder_service.get_shareholder_details(
+        shareholder_id=shareholder_id,
+        user_id=current_user["id"],
+        user_role=current_user["role"]
+    )
 
     if not shareholder:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Shareholder not found"
+            detail="Shareholder not found or access denied"
         )
 
-    # Access control: shareholders can only view their own data
-    if current_user["role"] == "shareholder":
-        user_shareholder = shareholder_service.get_shareholder_by_user_id(current_user["id"])
-        if not user_shareholder or user_shareholder.id != shareholder_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied. You can only view your own shareholder profile."
-            )
-
     return shareholder
 
 
 @router.get("/user/{user_id}", response_model=ShareholderProfileResponse, summary="Get Shareholder by User ID")
-async def get_shareholder_by_user(
+def get_shareholder_by_user(
         user_id: int,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_current_active_user)
+        shareholder_service: ShareholderServiceDep,
+        current_user: CurrentUser
 ) -> ShareholderProfileResponse:
     """
     Get shareholder profile by user ID.
@@ -189,7 +187,7 @@ async def get_shareholder_by_user(
 
     Args:
         user_id: User ID
-        db: Database session
+        shareholder_service: Shareholder service
         current_user: Current authenticated user
 
     Returns:
@@ -205,7 +203,6 @@ async def get_shareholder_by_user(
             detail="Access denied. You can only view your own profile."
         )
 
-    shareholder_service = ShareholderService(db)
     shareholder = shareholder_service.get_shareholder_by_user_id(user_id)
 
     if not shareholder:
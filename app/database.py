@@ -2,27 +2,87 @@
 # This follows Dependency Inversion Principle by providing abstractions
 
 import logging
-from typing import Generator
+import threading
+from contextvars import ContextVar
+from typing import Optional
 
-from sqlalchemy import create_engine
+import orjson
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
 
 from app.config import settings
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Server-side guard against runaway queries (PostgreSQL/libpq only)
+connect_args = {}
+if make_url(settings.database_url).get_backend_name() == "postgresql":
+    connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+
+def _json_serializer(value) -> str:
+    """Encode JSON column values (audit event_data) with orjson instead of the stdlib"""
+    return orjson.dumps(value).decode()
+
+
 # SQLAlchemy engine with connection pooling for performance
 engine = create_engine(
     settings.database_url,
     # Connection pooling settings for performance
-    pool_size=10,  # Number of connections to maintain in pool
-    max_overflow=20,  # Additional connections beyond pool_size
+    # Keep pool_size x workers below the server's max_connections
+    pool_size=settings.db_pool_size,  # Number of connections to maintain in pool
+    max_overflow=settings.db_pool_overflow,  # Additional connections beyond pool_size
+    pool_timeout=settings.db_pool_timeout,  # Wait for a free connection before raising
     pool_pre_ping=True,  # Validate connections before use
+    pool_recycle=settings.db_pool_recycle,  # Replace connections before idle timeouts drop them
+    pool_use_lifo=True,  # Reuse the most recently returned (warm) connection first
+    query_cache_size=1200,  # Compiled statement cache, sized for all repository queries
+    connect_args=connect_args,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
     echo=settings.debug  # Log SQL queries in debug mode
 )
 
+# Pool activity counters, maintained by the engine's pool events
+_pool_counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+_pool_counters_lock = threading.Lock()
+
+
+def _count_pool_event(name: str):
+    def listener(*args):
+        with _pool_counters_lock:
+            _pool_counters[name] += 1
+    return listener
+
+
+event.listen(engine, "connect", _count_pool_event("connects"))
+event.listen(engine, "checkout", _count_pool_event("checkouts"))
+event.listen(engine, "checkin", _count_pool_event("checkins"))
+event.listen(engine, "invalidate", _count_pool_event("invalidations"))
+
+
+def get_pool_status() -> dict:
+    """
+    Snapshot of connection pool usage for monitoring.
+    A checked_out count near size + max_overflow means requests are about to queue.
+
+    Returns:
+        Current pool gauges and cumulative event counters
+    """
+    pool = engine.pool
+    with _pool_counters_lock:
+        counters = dict(_pool_counters)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.db_pool_overflow,
+        **counters
+    }
+
+
 # Session factory - follows Factory pattern
 SessionLocal = sessionmaker(
     autocommit=False,  # Explicit transaction control
@@ -30,25 +90,68 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Request-scoped sessions - one session per HTTP request, set up by DBSessionMiddleware
+_request_scope: ContextVar[Optional[object]] = ContextVar("db_request_scope", default=None)
+ScopedSession = scoped_session(SessionLocal, scopefunc=_request_scope.get)
+
 # Base class for all database models
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+class DBSessionMiddleware:
+    """
+    ASGI middleware binding a database session scope to each request.
+    The session is closed and its connection returned to the pool once the
+    response has been sent, whether or not the request failed.
     """
-    Dependency injection for database sessions.
-    Ensures proper session lifecycle management.
 
-    Yields:
-        Session: Database session instance
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_scope.set(object())
+        try:
+            await self.app(scope, receive, send)
+        except Exception as e:
+            logger.error("Request failed, rolling back database session: %s", e)
+            raise
+        finally:
+            # Close session (rolling back anything uncommitted) to prevent connection leaks
+            ScopedSession.remove()
+            _request_scope.reset(token)
+
+
+def warm_pool(size: int = settings.db_pool_warm_connections) -> None:
+    """
+    Open pool connections ahead of the first requests.
+    Connections are checked out together, so the pool really ends up
+    holding `size` of them rather than reusing one.
+
+    Args:
+        size: Number of connections to open (capped at the pool size)
     """
-    db = SessionLocal()
+    connections = []
     try:
-        yield db
-    except Exception as e:
-        logger.error(f"Database error: {e}")
-        db.rollback()
-        raise
+        for _ in range(min(size, engine.pool.size())):
+            conn = engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
     finally:
-        # Close session to prevent connection leaks
-        db.close()
+        for conn in connections:
+            conn.close()
+
+
+def get_db() -> Session:
+    """
+    Dependency injection for database sessions.
+    Returns the session bound to the current request; its lifecycle
+    is managed by DBSessionMiddleware, so no teardown is needed here.
+
+    Returns:
+        Session: Database session instance
+    """
+    return ScopedSession()
@@ -1,17 +1,34 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import sys
+import threading
 import time
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
-from fastapi import FastAPI, Request, status
+from fastapi import APIRouter, Depends, FastAPI, Request, status
 from fastapi.exception_handlers import http_exception_handler
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
 
+# Imported once here rather than inside the lifespan and seeding functions
 from app.config import settings
+from app.database import Base, DBSessionMiddleware, SessionLocal, engine, get_db, get_pool_status, warm_pool
+from app.models.shareholder import ShareholderProfile
+from app.models.user import User, UserRole
+from app.repositories.audit import AuditRepository
+from app.repositories.shareholder import ShareholderRepository, ShareIssuanceRepository
+from app.services.audit_queue import audit_queue
+from app.services.pdf import shutdown_pdf_pool
+from app.utils.security import get_password_hash, measure_password_hash_ms
 
 # Configure logging
 logging.basicConfig(
@@ -21,28 +38,87 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+# Request threads only enqueue records; a listener thread formats and writes them
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, *logging.getLogger().handlers, respect_handler_level=True
+)
+logging.getLogger().handlers = [_DeferredQueueHandler(_log_queue)]
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+def start_log_listener() -> None:
+    """Start the log writer thread if it is not already running"""
+    global _listener_started
+    with _listener_lock:
+        if not _listener_started:
+            _log_listener.start()
+            _listener_started = True
+
+
+def stop_log_listener() -> None:
+    """Flush queued records and stop the log writer thread if it is running"""
+    global _listener_started
+    with _listener_lock:
+        if _listener_started:
+            _log_listener.stop()
+            _listener_started = False
+
+
+start_log_listener()
+atexit.register(stop_log_listener)  # Flush pending records when the app never ran its lifespan
+
+
+class HealthCheckLogFilter(logging.Filter):
+    """Drop access-log records for health probes - one tuple lookup per record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # uvicorn.access args: (client_addr, method, full_path, http_version, status_code)
+        args = record.args
+        return not (isinstance(args, tuple) and len(args) > 2 and str(args[2]).startswith("/health"))
+
+
+# Health probes already bypass the app's request logging; this keeps them out of the server access log
+logging.getLogger("uvicorn.access").addFilter(HealthCheckLogFilter())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
+    start_log_listener()
     logger.info(f"Starting {
     settings.app_name}...")
 
-    try:
-        from app.database import engine, Base
-
-        # Import ALL models for proper table creation
-        import app.models.user
-        try:
-            import app.models.shareholder
-            import app.models.audit
-        except ImportError:
-            logger.warning("Some models not available - continuing with basic setup")
+    # A slow reading here points at a non-SIMD argon2 build or mistuned parameters
+    logger.info(
+        "Password hashing: Argon2id t=%d m=%dKiB p=%d, %.0f ms per hash",
+        settings.argon2_time_cost, settings.argon2_memory_cost_kib, settings.argon2_parallelism,
+        measure_password_hash_ms()
+    )
 
+    try:
+        # Every model is registered on Base by the model and repository imports above
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created successfully")
 
         await create_default_users()
         logger.info("Default users initialized")
+
+        warm_pool()
+        logger.info("Database connection pool warmed")
+
+        audit_queue.start()
+        prune_audit_events()
+        backfill_shareholder_totals()
+        backfill_certificate_counters()
         logger.info(f"{settings.app_name} started successfully")
 
     except Exception as e:
@@ -53,8 +129,16 @@ async def lifespan(app: FastAPI):
 
     # 🛑 Shutdown logic
     logger.info(f"Shutting down {settings.app_name}...")
+    # Write out audit events still waiting in the queue
+    audit_queue.stop()
+
+    # Stop the certificate render workers, if any were started
+    shutdown_pdf_pool()
     logger.info("Application shut down successfully")
 
+    # Flush queued log records and stop the writer thread
+    stop_log_listener()
+
 
 app = FastAPI(
     title=settings.app_name,
@@ -65,20 +149,28 @@ app = FastAPI(
     redoc_url="/redoc",
     openapi_url="/openapi.json",
     lifespan=lifespan,
+    # orjson serialises the issuance/shareholder listings several times faster than stdlib json
+    default_response_class=ORJSONResponse,
 )
 
+# CORS configuration, resolved once at import
+_CORS_TESTING = bool(os.getenv("TESTING") or os.getenv("PYTEST_CURRENT_TEST"))
+ALLOW_ORIGINS = frozenset((
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://testserver",  # Added for testing
+    "*" if _CORS_TESTING else "null",
+))  # Set: the middleware checks each request's Origin with `in`
+ALLOW_METHODS = ("GET", "POST", "PUT", "DELETE", "OPTIONS")
+
 # CORS Middleware - Test-friendly
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://testserver",  # Added for testing
-        "*" if (os.getenv("TESTING") or os.getenv("PYTEST_CURRENT_TEST")) else "null"
-    ],
+    allow_origins=ALLOW_ORIGINS,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=ALLOW_METHODS,
     allow_headers=["*"],
+    max_age=86400,  # Let browsers reuse preflight responses for 24h instead of re-sending OPTIONS
 )
 
 
@@ -102,40 +194,74 @@ else:
     logger.info("TrustedHostMiddleware disabled (testing mode)")
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    client_ip = request.client.host
-    method = request.method
-    url = str(request.url)
+# One database session per request, always released after the response
+app.add_middleware(DBSessionMiddleware)
 
-    response = await call_next(request)
 
-    process_time = time.time() - start_time
-    logger.info(f"{method} {url} - {response.status_code} - {process_time:.3f}s - Client: {client_ip}")
-    response.headers["X-Process-Time"] = str(
-        process_time)  # Adding the time it took to process the request to the response headers
-    return response
+class RequestLoggingMiddleware:
+    """
+    Pure ASGI request logging and timing middleware.
+    Unlike @app.middleware("http") (BaseHTTPMiddleware) it adds no extra task or
+    memory stream per request - it only wraps `send` to observe the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()  # Monotonic, unaffected by wall-clock adjustments
+        status_code = None
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = time.perf_counter() - start_time
+                # Adding the time it took to process the request to the response headers;
+                # appended in place as raw bytes, no header object or str round-trip
+                message.setdefault("headers", []).append((b"x-process-time", b"%.6f" % process_time))
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+        # The request line is only built if INFO is actually emitted
+        if logger.isEnabledFor(logging.INFO):
+            client = scope.get("client")
+            logger.info("%s %s - %s - %.3fs - Client: %s",
+                        scope["method"], Request(scope).url, status_code,
+                        time.perf_counter() - start_time, client[0] if client else "-")
+
+
+app.add_middleware(RequestLoggingMiddleware)
 
 
 @app.exception_handler(HTTPException)
 async def custom_http_exception_handler(request: Request, exc: HTTPException):
-    logger.warning(
-        f"HTTP {exc.status_code} - {exc.detail} - {request.method} {request.url} - Client: {request.client.host}"
-    )
+    # Lazy %-style args: nothing is formatted if WARNING is filtered out
+    logger.warning("HTTP %s - %s - %s %s - Client: %s",
+                   exc.status_code, exc.detail, request.method, request.url, request.client.host)
     return await http_exception_handler(request, exc)
 
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unexpected error: {exc} - {request.method} {request.url}", exc_info=True)
+    logger.error("Unexpected error: %s - %s %s", exc, request.method, request.url, exc_info=True)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "An unexpected error occurred. Please contact support.", "error_type": "internal_error"}
     )
 
 
-@app.get("/health", tags=["Health"])
+# Health routes live on their own router: they are served by a bare sub-app (see below)
+# and only included in the main app so they still show up in the API docs
+health_router = APIRouter(tags=["Health"])
+
+
+@health_router.get("/health")
 async def health_check():
     return {
         "status": "healthy",
@@ -145,9 +271,17 @@ async def health_check():
     }
 
 
+# Probe statement, built once and reused from SQLAlchemy's compiled cache
+SELECT_1 = text("SELECT 1")
+
+# Last database check, shared by probes within settings.health_cache_ttl_seconds
+_health_cache = {"checked_at": float("-inf"), "database": None}
+_health_lock = threading.Lock()
+
+
 # Detailed health includes DB as well
-@app.get("/health/detailed", tags=["Health"])
-async def detailed_health_check():
+@health_router.get("/health/detailed")
+def detailed_health_check(db: Session = Depends(get_db)):
     health_status = {
         "status": "healthy",
         "app_name": settings.app_name,
@@ -155,22 +289,60 @@ async def detailed_health_check():
         "timestamp": time.time(),
         "checks": {}
     }
-    try:
-        from sqlalchemy.orm import sessionmaker
-        from app.database import engine
 
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
-        result = db.execute("SELECT 1").fetchone()
-        db.close()
-        health_status["checks"]["database"] = "healthy"
-    except Exception as e:
-        health_status["checks"]["database"] = f"unhealthy: {e}"
+    # Only one probe refreshes an expired result; concurrent ones wait and reuse it
+    with _health_lock:
+        if time.monotonic() - _health_cache["checked_at"] >= settings.health_cache_ttl_seconds:
+            try:
+                db.execute(SELECT_1).scalar()
+                _health_cache["database"] = "healthy"
+            except Exception as e:
+                _health_cache["database"] = f"unhealthy: {e}"
+            _health_cache["checked_at"] = time.monotonic()
+        database_status = _health_cache["database"]
+
+    health_status["checks"]["database"] = database_status
+    if database_status != "healthy":
         health_status["status"] = "unhealthy"
 
+    # Pool gauges are in-process and cheap, so always reported live
+    health_status["checks"]["pool"] = get_pool_status()
+
     return health_status
 
 
+app.include_router(health_router)
+
+# Probes don't need CORS, trusted-host checks or request logging; at one probe per
+# second they would otherwise dominate the access log. They get a bare app that only
+# manages the database session.
+health_app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None, default_response_class=ORJSONResponse)
+health_app.include_router(health_router)
+health_app.add_middleware(DBSessionMiddleware)
+
+
+class HealthProbeMiddleware:
+    """
+    Outermost ASGI middleware sending health probes straight to the health app,
+    bypassing the main app's middleware stack.
+    """
+
+    def __init__(self, app, health_app, paths=("/health", "/health/detailed")):
+        self.app = app
+        self.health_app = health_app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            await self.health_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+# Must stay the last middleware added so it wraps all the others
+app.add_middleware(HealthProbeMiddleware, health_app=health_app)
+
+
 @app.get("/", tags=["Root"])
 async def root():
     return {
@@ -249,54 +421,96 @@ except ImportError as e:
         return {"message": "Issuances endpoint - implementation pending"}
 
 
+def backfill_shareholder_totals() -> None:
+    """Fill the dashboard's per-shareholder totals from the issuances table on first start"""
+    db = SessionLocal()
+    try:
+        if ShareholderRepository(db).backfill_totals():
+            logger.info("Shareholder totals backfilled from existing issuances")
+    except Exception as e:
+        db.rollback()
+        logger.error("Shareholder totals backfill failed: %s", e)
+    finally:
+        db.close()
+
+
+def backfill_certificate_counters() -> None:
+    """Continue each year's certificate sequence after the certificates issued before the counters existed"""
+    db = SessionLocal()
+    try:
+        if ShareIssuanceRepository(db).backfill_certificate_counters():
+            logger.info("Certificate counters seeded from existing certificates")
+    except Exception as e:
+        db.rollback()
+        logger.error("Certificate counter backfill failed: %s", e)
+    finally:
+        db.close()
+
+
+def prune_audit_events() -> None:
+    """
+    Apply the audit retention window (settings.audit_max_age_days).
+    Deletes in small committed batches, oldest first, via the created_at index.
+    """
+    if settings.audit_max_age_days <= 0:
+        return
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.audit_max_age_days)
+    db = SessionLocal()
+    try:
+        deleted = AuditRepository(db).delete_older_than(cutoff)
+        if deleted:
+            logger.info("Pruned %d audit events older than %d days", deleted, settings.audit_max_age_days)
+    except Exception as e:
+        db.rollback()
+        logger.error("Audit retention pruning failed: %s", e)
+    finally:
+        db.close()
+
+
 async def create_default_users():
     try:
-        from sqlalchemy.orm import sessionmaker
-        from app.database import engine
-        from app.repositories.user import UserRepository
-        from app.models.user import UserRole
-        from app.utils.security import get_password_hash
+        # (email, password, role) of the accounts every fresh install starts with
+        default_users = [
+            ("admin@captable.com", "admin123", UserRole.ADMIN),
+            ("shareholder@example.com", "shareholder123", UserRole.SHAREHOLDER),
+        ]
 
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         db = SessionLocal()
         try:
-            user_repo = UserRepository(db)
-            admin_email = "admin@captable.com"
-            admin = user_repo.get_by_email(admin_email)
-            if not admin:
-                admin = user_repo.create({
-                    "email": admin_email,
-                    "hashed_password": get_password_hash("admin123"),
-                    "role": UserRole.ADMIN,
-                    "is_active": True
-                })
-                logger.info(f"Created admin user: {admin_email}")
-
-            shareholder_email = "shareholder@example.com"
-            share = user_repo.get_by_email(shareholder_email)
-            if not share:
-                share = user_repo.create({
-                    "email": shareholder_email,
-                    "hashed_password": get_password_hash("shareholder123"),
-                    "role": UserRole.SHAREHOLDER,
-                    "is_active": True
-                })
-                logger.info(f"Created shareholder user: {shareholder_email}")
-
-                # ShareholderRepository imports
-                try:
-                    from app.repositories.shareholder import ShareholderRepository
-                    repo = ShareholderRepository(db)
-                    repo.create({
-                        "user_id": share.id,
-                        "full_name": "John Doe",
-                        "phone": "+1-555-0123",
-                        "address": "123 Main St, Anytown, ST 12345"
-                    })
+            # One round trip to see which default users already exist
+            emails = [email for email, _, _ in default_users]
+            existing = set(db.scalars(select(User.email).where(User.email.in_(emails))))
+            missing = [seed for seed in default_users if seed[0] not in existing]
+            if not missing:
+                return
+
+            # Single multi-row INSERT; ON CONFLICT keeps concurrent workers from failing on the race
+            dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+            created = db.execute(
+                dialect.insert(User)
+                .values([
+                    {"email": email, "hashed_password": get_password_hash(password), "role": role, "is_active": True}
+                    for email, password, role in missing
+                ])
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(User.id, User.email, User.role)
+            ).all()
+            for row in created:
+                logger.info(f"Created {row.role.value} user: {row.email}")
+
+            # Shareholder profile for a newly created default shareholder, in the same transaction
+            for row in created:
+                if row.role == UserRole.SHAREHOLDER:
+                    db.add(ShareholderProfile(
+                        user_id=row.id,
+                        full_name="John Doe",
+                        phone="+1-555-0123",
+                        address="123 Main St, Anytown, ST 12345"
+                    ))
                     logger.info("Created shareholder profile for default user")
-                except ImportError:
-                    logger.warning("ShareholderRepository not available - skipping profile creation")
-                    ShareholderRepository = None  # To handle import error in case of missing module
+
+            db.commit()
 
         except Exception as e:
             logger.error(f"Failed to create default users: {e}")
@@ -1,7 +1,7 @@
 # Audit trail model for compliance and tracking
 # Single responsibility: logging system events
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, JSON, desc
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -14,16 +14,26 @@ class AuditEvent(Base):
     Immutable records for compliance and security monitoring.
     """
     __tablename__ = "audit_events"
+    __table_args__ = (
+        # Compliance lookups: events of a type for a user over a time range
+        Index("ix_audit_user_type_time", "user_id", "event_type", "created_at"),
+        # Newest-first listings (get_by_user, get_by_event_type)
+        # read these in index order and stop at the LIMIT - no sort step
+        Index("ix_audit_user_created", "user_id", desc("created_at")),
+        Index("ix_audit_event_type_created", "event_type", desc("created_at")),
+        # Retention purge (delete_older_than) walks the oldest events first
+        Index("ix_audit_created", desc("created_at")),
+    )
 
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
 
     # Event classification
-    event_type = Column(String(100), nullable=False, index=True)  # login, share_issuance, etc.
+    event_type = Column(String(100), nullable=False)  # login, share_issuance, etc. - indexed via ix_audit_event_type_created
     event_description = Column(String(255), nullable=False)
 
     # User who performed the action - nullable for system events
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Indexed via ix_audit_user_created
 
     # IP address for security tracking
     ip_address = Column(String(45), nullable=True)  # Supports IPv6
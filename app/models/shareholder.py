@@ -3,8 +3,9 @@
 
 from decimal import Decimal
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Computed, Integer, String, ForeignKey, DateTime, Index, Numeric, Text, cast, select
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 
 from app.database import Base
@@ -40,14 +41,6 @@ class ShareholderProfile(Base):
         order_by="ShareIssuance.issued_date.desc()"  # Most recent first
     )
 
-    @property
-    def total_shares(self) -> int:
-        """
-        Calculate total shares owned by this shareholder.
-        Property provides computed field without database storage.
-        """
-        return sum(issuance.number_of_shares for issuance in self.share_issuances)
-
     def __repr__(self) -> str:
         return f"<ShareholderProfile(id={self.id}, name='{self.full_name}')>"
 
@@ -58,21 +51,27 @@ class ShareIssuance(Base):
     Each issuance is immutable once created for audit purposes.
     """
     __tablename__ = "share_issuances"
+    __table_args__ = (
+        # Matches the per-shareholder listing order (most recent first); the included
+        # columns let the per-shareholder totals aggregate from the index alone on Postgres
+        Index("ix_issuance_holder_date", "shareholder_id", "issued_date",
+              postgresql_include=["number_of_shares", "total_value_cents"]),
+    )
 
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
 
-    # Foreign key to shareholder - indexed for fast queries
+    # Foreign key to shareholder - indexed via ix_issuance_holder_date
     shareholder_id = Column(
         Integer,
         ForeignKey("shareholder_profiles.id"),
-        nullable=False,
-        index=True
+        nullable=False
     )
 
-    # Share details - using Numeric for precise financial calculations
+    # Share details - prices stored as integer cents: exact, fixed-width and cheap to SUM
     number_of_shares = Column(Integer, nullable=False)
-    price_per_share = Column(Numeric(10, 2), nullable=False)  # 2 decimal places
+    price_cents = Column(BigInteger, nullable=False)
+    total_value_cents = Column(BigInteger, Computed("number_of_shares * price_cents", persisted=True))
 
     # Issuance metadata
     issued_date = Column(DateTime(timezone=True), server_default=func.now())
@@ -85,10 +84,75 @@ class ShareIssuance(Base):
     # Relationship to shareholder
     shareholder = relationship("ShareholderProfile", back_populates="share_issuances")
 
+    @hybrid_property
+    def price_per_share(self) -> Decimal:
+        """Price per share in currency units, with two decimal places"""
+        return Decimal(self.price_cents).scaleb(-2)
+
+    @price_per_share.setter
+    def price_per_share(self, value) -> None:
+        cents = Decimal(value) * 100
+        if cents != cents.to_integral_value():
+            raise ValueError("price_per_share cannot have more than 2 decimal places")
+        self.price_cents = int(cents)
+
+    @price_per_share.expression
+    def price_per_share(cls):
+        return cast(cls.price_cents, Numeric(14, 2)) / 100
+
     @property
     def total_value(self) -> Decimal:
-        """Calculate total value of this issuance"""
-        return Decimal(self.number_of_shares) * self.price_per_share
+        """Total value of this issuance, from the stored generated column once persisted"""
+        cents = self.total_value_cents
+        if cents is None:  # Not flushed yet - the database hasn't computed it
+            cents = self.number_of_shares * self.price_cents
+        return Decimal(cents).scaleb(-2)
 
     def __repr__(self) -> str:
         return f"<ShareIssuance(id={self.id}, shares={self.number_of_shares}, cert={self.certificate_number})>"
+
+
+class ShareholderTotals(Base):
+    """
+    Running issuance totals per shareholder, updated in the same transaction as
+    each issuance. Lets the admin dashboard read one row per shareholder instead
+    of aggregating every issuance on each request.
+    """
+    __tablename__ = "shareholder_totals"
+
+    shareholder_id = Column(Integer, ForeignKey("shareholder_profiles.id"), primary_key=True, autoincrement=False)
+    total_shares = Column(BigInteger, nullable=False, default=0)
+    total_value_cents = Column(BigInteger, nullable=False, default=0)
+    issuance_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<ShareholderTotals(shareholder_id={self.shareholder_id}, shares={self.total_shares})>"
+
+
+class CertificateCounter(Base):
+    """
+    Next certificate sequence number per year.
+    A single-row upsert hands out numbers instead of scanning existing certificates.
+    """
+    __tablename__ = "cert_counters"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    next_val = Column(BigInteger, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<CertificateCounter(year={self.year}, next_val={self.next_val})>"
+
+
+# Total shares owned by a shareholder, read from the maintained shareholder_totals row
+# (a primary-key lookup) rather than summed over issuances. Deferred so plain profile lookups
+# don't pay for it; queries that need it use undefer(ShareholderProfile.total_shares).
+ShareholderProfile.total_shares = column_property(
+    func.coalesce(
+        select(ShareholderTotals.total_shares)
+        .where(ShareholderTotals.shareholder_id == ShareholderProfile.id)
+        .correlate_except(ShareholderTotals)
+        .scalar_subquery(),
+        0
+    ),
+    deferred=True
+)
@@ -3,7 +3,7 @@
 
 import enum
 
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -57,3 +57,10 @@ class User(Base):
     def __repr__(self) -> str:
         """String representation for debugging"""
         return f"<User(id={self.id}, email='{self.email}', role='{self.role}')>"
+
+
+# Partial indexes over active accounts only - they stay small as users are deactivated.
+# The predicate matches the repositories' User.is_active == True filters, so the planner uses them.
+_active_user = User.is_active == True  # noqa: E712
+Index("ix_users_role_active", User.role, postgresql_where=_active_user, sqlite_where=_active_user)
+Index("ix_users_active", User.id, postgresql_where=_active_user, sqlite_where=_active_user)
@@ -1,9 +1,10 @@
 # Audit repository for compliance and monitoring
 
+from datetime import datetime
 from typing import List
 
-from sqlalchemy import desc
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, desc, insert, select
+from sqlalchemy.orm import Session
 
 from app.models.audit import AuditEvent
 from app.repositories.base import BaseRepository
@@ -23,6 +24,10 @@ class AuditRepository(BaseRepository[AuditEvent, dict, None]):
         """
         Create audit event with standardized structure.
 
+        Deprecated: commits and refreshes per event. Use stage_event to write
+        inside the caller's transaction, or app.services.audit_queue for
+        fire-and-forget events.
+
         Args:
             event_type: Type of event (login, share_issuance, etc.)
             description: Human-readable description
@@ -46,6 +51,93 @@ class AuditRepository(BaseRepository[AuditEvent, dict, None]):
         self.db.refresh(audit_event)
         return audit_event
 
+    def stage_event(self, event_type: str, description: str, user_id: int = None,
+                    ip_address: str = None, event_data: dict = None) -> AuditEvent:
+        """
+        Add audit event to the session without committing.
+        The event is written with the caller's next flush/commit.
+
+        Args:
+            event_type: Type of event (login, share_issuance, etc.)
+            description: Human-readable description
+            user_id: User who performed the action (optional for system events)
+            ip_address: Client IP address for security tracking
+            event_data: Additional event data as dictionary
+
+        Returns:
+            Pending audit event
+        """
+        audit_event = AuditEvent(
+            event_type=event_type,
+            event_description=description,
+            user_id=user_id,
+            ip_address=ip_address,
+            event_data=event_data or {}
+        )
+
+        self.db.add(audit_event)
+        return audit_event
+
+    def create_events_bulk(self, events: List[dict]) -> List[int]:
+        """
+        Create many audit events in a single INSERT round trip and one commit.
+
+        Args:
+            events: Events as dictionaries with the same keys as create_event
+                    (event_type, description, user_id, ip_address, event_data)
+
+        Returns:
+            IDs of the created audit events, in input order
+        """
+        if not events:
+            return []
+
+        rows = [
+            {
+                "event_type": event["event_type"],
+                "event_description": event["description"],
+                "user_id": event.get("user_id"),
+                "ip_address": event.get("ip_address"),
+                "event_data": event.get("event_data") or {}
+            }
+            for event in events
+        ]
+
+        # executemany with RETURNING - batched into multi-row INSERTs by SQLAlchemy's insertmanyvalues
+        event_ids = self.db.scalars(insert(AuditEvent).returning(AuditEvent.id, sort_by_parameter_order=True),
+                                    rows).all()
+        self.db.commit()
+        return list(event_ids)
+
+    def delete_older_than(self, cutoff: datetime, batch_size: int = 5000) -> int:
+        """
+        Delete audit events created before the cutoff, in short batches.
+        Each batch commits separately so long retention runs never hold
+        a large lock set or one huge transaction.
+
+        Args:
+            cutoff: Events created before this moment are deleted
+            batch_size: Maximum rows deleted per statement
+
+        Returns:
+            Number of deleted events
+        """
+        deleted = 0
+        while True:
+            batch = (
+                select(AuditEvent.id)
+                .where(AuditEvent.created_at < cutoff)
+                .order_by(AuditEvent.created_at)
+                .limit(batch_size)
+            )
+            count = self.db.execute(
+                delete(AuditEvent).where(AuditEvent.id.in_(batch.scalar_subquery()))
+            ).rowcount
+            self.db.commit()
+            deleted += count
+            if count < batch_size:
+                return deleted
+
     def get_by_user(self, user_id: int, limit: int = 50) -> List[AuditEvent]:
         """
         Get audit events for specific user.
@@ -83,22 +175,3 @@ class AuditRepository(BaseRepository[AuditEvent, dict, None]):
             .limit(limit)
             .all()
         )
-
-    def get_recent_events(self, limit: int = 100) -> List[AuditEvent]:
-        """
-        Get recent audit events with user data.
-        Used for admin dashboard monitoring.
-
-        Args:
-            limit: Maximum number of events to return
-
-        Returns:
-            List of recent audit events with user data
-        """
-        return (
-            self.db.query(AuditEvent)
-            .options(joinedload(AuditEvent.user))
-            .order_by(desc(AuditEvent.created_at))
-            .limit(limit)
-            .all()
-        )
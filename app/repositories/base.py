@@ -43,7 +43,22 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC
         Returns:
             Model instance or None if not found
         """
-        return self.db.query(self.model).filter(self.model.id == id).first()
+        # Identity-map hit when already loaded in this session, primary-key SELECT otherwise
+        return self.db.get(self.model, id)
+
+    def get_many_by_ids(self, ids: List[int]) -> List[ModelType]:
+        """
+        Get several records by ID in one query.
+
+        Args:
+            ids: Record IDs
+
+        Returns:
+            Model instances found, in no particular order
+        """
+        if not ids:
+            return []
+        return self.db.query(self.model).filter(self.model.id.in_(ids)).all()
 
     def get_multi(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
         """
@@ -71,12 +86,14 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC
         """
         return self.db.query(self.model).filter(getattr(self.model, field) == value).first()
 
-    def create(self, obj_in: CreateSchemaType) -> ModelType:
+    def create(self, obj_in: CreateSchemaType, commit: bool = True) -> ModelType:
         """
         Create a new record.
 
         Args:
             obj_in: Creation schema instance
+            commit: Commit right away; False only flushes, leaving the commit to the
+                    caller's transaction (the generated ID is available either way)
 
         Returns:
             Created model instance
@@ -86,17 +103,15 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC
             :rtype: ModelType
         """
         # Convert Pydantic model to dict, excluding unset values
-        if hasattr(obj_in, 'dict'):
-            obj_data = obj_in.dict(exclude_unset=True)
-        elif hasattr(obj_in, 'model_dump'):
-            obj_data = obj_in.model_dump(exclude_unset=True)
-        else:
-            obj_data = obj_in
+        obj_data = obj_in.model_dump(exclude_unset=True) if hasattr(obj_in, 'model_dump') else obj_in
 
         db_obj = self.model(**obj_data)
 
         try:
             self.db.add(db_obj)
+            if not commit:
+                self.db.flush()
+                return db_obj
             self.db.commit()
             self.db.refresh(db_obj)  # Get updated object with generated fields
             return db_obj
@@ -116,12 +131,7 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType], ABC
             Updated model instance
         """
         # Get update data, excluding unset values
-        if hasattr(obj_in, 'dict'):
-            update_data = obj_in.dict(exclude_unset=True)
-        elif hasattr(obj_in, 'model_dump'):
-            update_data = obj_in.model_dump(exclude_unset=True)
-        else:
-            update_data = obj_in
+        update_data = obj_in.model_dump(exclude_unset=True) if hasattr(obj_in, 'model_dump') else obj_in
 
         # Update fields
         for field, value in update_data.items():
@@ -1,16 +1,24 @@
 # Shareholder-specific repository with complex queries
 # Optimized for performance with proper indexing and joins
 
+from datetime import datetime
+from decimal import Decimal
 from typing import List, Optional
 
-from sqlalchemy import func, desc
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Integer, cast, desc, func, insert, literal_column, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload, selectinload, undefer
 
-from app.models.shareholder import ShareholderProfile, ShareIssuance
+from app.models.shareholder import CertificateCounter, ShareholderProfile, ShareholderTotals, ShareIssuance
 from app.models.user import User
 from app.repositories.base import BaseRepository
 from app.schemas.shareholder import ShareholderProfileCreate, ShareholderProfileUpdate, ShareIssuanceCreate
 
+# PostgreSQL advisory lock keys serialising the startup backfills across workers
+_TOTALS_BACKFILL_LOCK_ID = 0x5348544F  # "SHTO"
+_CERT_COUNTER_BACKFILL_LOCK_ID = 0x43455254  # "CERT"
+
 
 class ShareholderRepository(BaseRepository[ShareholderProfile, ShareholderProfileCreate, ShareholderProfileUpdate]):
     """
@@ -32,11 +40,25 @@ class ShareholderRepository(BaseRepository[ShareholderProfile, ShareholderProfil
         Returns:
             ShareholderProfile with loaded user data
         """
+        return self.db.get(ShareholderProfile, shareholder_id, options=[joinedload(ShareholderProfile.user)])
+
+    def get_many_with_users(self, shareholder_ids: List[int]) -> List[ShareholderProfile]:
+        """
+        Get several shareholders with their user data in two queries.
+
+        Args:
+            shareholder_ids: Shareholder IDs
+
+        Returns:
+            ShareholderProfiles found, with loaded user data
+        """
+        if not shareholder_ids:
+            return []
         return (
             self.db.query(ShareholderProfile)
-            .options(joinedload(ShareholderProfile.user))
-            .filter(ShareholderProfile.id == shareholder_id)
-            .first()
+            .options(selectinload(ShareholderProfile.user))
+            .filter(ShareholderProfile.id.in_(shareholder_ids))
+            .all()
         )
 
     def get_by_user_id(self, user_id: int) -> Optional[ShareholderProfile]:
@@ -52,48 +74,112 @@ class ShareholderRepository(BaseRepository[ShareholderProfile, ShareholderProfil
         """
         return self.db.query(ShareholderProfile).filter(ShareholderProfile.user_id == user_id).first()
 
-    def get_all_with_totals(self) -> List[dict]:
+    def get_with_issuances_by_user_id(self, user_id: int) -> Optional[ShareholderProfile]:
+        """
+        Get the shareholder profile owned by a user, with its issuances and total shares.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            ShareholderProfile with loaded issuances or None
+        """
+        return (
+            self.db.query(ShareholderProfile)
+            .options(selectinload(ShareholderProfile.share_issuances), undefer(ShareholderProfile.total_shares))
+            .filter(ShareholderProfile.user_id == user_id)
+            .first()
+        )
+
+    def get_all_with_totals(self, skip: int = 0, limit: int = 100) -> List[dict]:
         """
         Get all shareholders with calculated share totals.
         Optimized query for admin dashboard - single database call.
 
+        Args:
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+
         Returns:
             List of dictionaries with shareholder data and totals
         """
+        # Totals are maintained per issuance in shareholder_totals - no aggregation here
+        totals = ShareholderTotals
+        total_shares = func.coalesce(totals.total_shares, 0).label('total_shares')
         return (
             self.db.query(
                 ShareholderProfile.id,
                 ShareholderProfile.full_name,
                 User.email,
-                func.coalesce(func.sum(ShareIssuance.number_of_shares), 0).label('total_shares'),
-                func.coalesce(func.sum(ShareIssuance.number_of_shares * ShareIssuance.price_per_share), 0).label(
-                    'total_value'),
-                func.count(ShareIssuance.id).label('issuance_count')
+                total_shares,
+                func.coalesce(totals.total_value_cents, 0).label('total_value_cents'),
+                func.coalesce(totals.issuance_count, 0).label('issuance_count')
             )
             .join(User, ShareholderProfile.user_id == User.id)
-            .outerjoin(ShareIssuance, ShareholderProfile.id == ShareIssuance.shareholder_id)
-            .group_by(ShareholderProfile.id, ShareholderProfile.full_name, User.email)
-            .order_by(desc('total_shares'))
+            .outerjoin(totals, totals.shareholder_id == ShareholderProfile.id)
+            .order_by(desc(total_shares), ShareholderProfile.id)
+            .offset(skip)
+            .limit(limit)
             .all()
         )
 
-    def get_with_issuances(self, shareholder_id: int) -> Optional[ShareholderProfile]:
+    def backfill_totals(self) -> bool:
+        """
+        Populate shareholder_totals from the issuances table if it is still empty,
+        i.e. issuances recorded before the totals table existed.
+        Once any row exists the running upserts own the table and this is a no-op,
+        so workers booting beside live ones never rebuild totals under concurrent issuances.
+        Aggregates by shareholder_id alone (index-only via ix_issuance_holder_date).
+
+        Returns:
+            True if any totals rows were inserted
+        """
+        is_postgresql = self.db.get_bind().dialect.name == "postgresql"
+        if is_postgresql:
+            # Workers starting together take turns; the lock is released with the transaction
+            self.db.execute(select(func.pg_advisory_xact_lock(_TOTALS_BACKFILL_LOCK_ID)))
+
+        if self.db.scalar(select(ShareholderTotals.shareholder_id).limit(1)) is not None:
+            self.db.rollback()
+            return False
+
+        dialect = postgresql if is_postgresql else sqlite
+        inserted = self.db.execute(
+            dialect.insert(ShareholderTotals).from_select(
+                ["shareholder_id", "total_shares", "total_value_cents", "issuance_count"],
+                select(
+                    ShareIssuance.shareholder_id,
+                    func.sum(ShareIssuance.number_of_shares),
+                    func.sum(ShareIssuance.total_value_cents),
+                    func.count()
+                ).group_by(ShareIssuance.shareholder_id)
+            ).on_conflict_do_nothing(index_elements=[ShareholderTotals.shareholder_id])
+        ).rowcount
+        self.db.commit()
+        return inserted > 0
+
+    def get_with_issuances(self, shareholder_id: int, user_id: Optional[int] = None) -> Optional[ShareholderProfile]:
         """
         Get shareholder with all share issuances.
         Uses joinedload for efficient data loading.
 
         Args:
             shareholder_id: Shareholder ID
+            user_id: If given, only match the profile owned by this user
 
         Returns:
             ShareholderProfile with loaded issuances
         """
-        return (
-            self.db.query(ShareholderProfile)
-            .options(joinedload(ShareholderProfile.share_issuances))
-            .filter(ShareholderProfile.id == shareholder_id)
-            .first()
+        # Primary-key lookup - no LIMIT subquery wrapping around the joined collection
+        shareholder = self.db.get(
+            ShareholderProfile,
+            shareholder_id,
+            options=[joinedload(ShareholderProfile.share_issuances), undefer(ShareholderProfile.total_shares)]
         )
+        if shareholder is not None and user_id is not None and shareholder.user_id != user_id:
+            # Ownership check on the loaded row
+            return None
+        return shareholder
 
 
 class ShareIssuanceRepository(BaseRepository[ShareIssuance, ShareIssuanceCreate, None]):
@@ -105,13 +191,128 @@ class ShareIssuanceRepository(BaseRepository[ShareIssuance, ShareIssuanceCreate,
     def __init__(self, db: Session):
         super().__init__(ShareIssuance, db)
 
-    def get_by_shareholder(self, shareholder_id: int) -> List[ShareIssuance]:
+    def create(self, obj_in: dict, commit: bool = True) -> ShareIssuance:
+        """
+        Create issuance and add it to the shareholder's running totals
+        in the same transaction.
+
+        Args:
+            obj_in: Issuance fields
+            commit: Commit right away; False leaves the commit to the caller's transaction
+
+        Returns:
+            Created share issuance
+
+        Raises:
+            IntegrityError: If database constraints are violated
+        """
+        issuance = ShareIssuance(**obj_in)
+
+        try:
+            self.db.add(issuance)
+            self.db.flush()
+            self._add_to_totals(issuance)
+            if not commit:
+                return issuance
+            self.db.commit()
+            self.db.refresh(issuance)
+            return issuance
+        except IntegrityError as e:
+            self.db.rollback()
+            raise e
+
+    def create_bulk(self, rows: List[dict], commit: bool = True) -> List[ShareIssuance]:
+        """
+        Create many issuances with one batched INSERT ... RETURNING and update
+        the running totals of every affected shareholder, in one transaction.
+
+        Args:
+            rows: Issuance fields (shareholder_id, number_of_shares, price_per_share,
+                  certificate_number, notes)
+            commit: Commit right away; False leaves the commit to the caller's transaction
+
+        Returns:
+            Created share issuances, in input order
+
+        Raises:
+            IntegrityError: If database constraints are violated
         """
-        Get all issuances for a specific shareholder.
+        if not rows:
+            return []
+
+        values = [
+            {
+                "shareholder_id": row["shareholder_id"],
+                "number_of_shares": row["number_of_shares"],
+                "price_cents": int(Decimal(row["price_per_share"]) * 100),
+                "certificate_number": row["certificate_number"],
+                "notes": row.get("notes")
+            }
+            for row in rows
+        ]
+
+        try:
+            issuances = self.db.scalars(
+                insert(ShareIssuance).returning(ShareIssuance, sort_by_parameter_order=True), values
+            ).all()
+
+            # One totals upsert per shareholder rather than per issuance
+            increments = {}
+            for value in values:
+                shares, cents, count = increments.get(value["shareholder_id"], (0, 0, 0))
+                increments[value["shareholder_id"]] = (
+                    shares + value["number_of_shares"],
+                    cents + value["number_of_shares"] * value["price_cents"],
+                    count + 1
+                )
+            for shareholder_id, (shares, cents, count) in increments.items():
+                self._increment_totals(shareholder_id, shares, cents, count)
+            if not commit:
+                return list(issuances)
+
+            issuance_ids = [issuance.id for issuance in issuances]
+            self.db.commit()
+
+            # Commit expired the new rows - reload them with one query instead of one each
+            self.db.scalars(select(ShareIssuance).where(ShareIssuance.id.in_(issuance_ids))).all()
+            return list(issuances)
+        except IntegrityError as e:
+            self.db.rollback()
+            raise e
+
+    def _add_to_totals(self, issuance: ShareIssuance) -> None:
+        self._increment_totals(issuance.shareholder_id, issuance.number_of_shares,
+                               issuance.number_of_shares * issuance.price_cents, 1)
+
+    def _increment_totals(self, shareholder_id: int, shares: int, value_cents: int, count: int) -> None:
+        # Upsert: the first issuance creates the row, later ones increment it under its row lock
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(ShareholderTotals).values(
+            shareholder_id=shareholder_id,
+            total_shares=shares,
+            total_value_cents=value_cents,
+            issuance_count=count
+        )
+        self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ShareholderTotals.shareholder_id],
+                set_={
+                    "total_shares": ShareholderTotals.total_shares + shares,
+                    "total_value_cents": ShareholderTotals.total_value_cents + value_cents,
+                    "issuance_count": ShareholderTotals.issuance_count + count
+                }
+            )
+        )
+
+    def get_by_shareholder(self, shareholder_id: int, skip: int = 0, limit: int = 100) -> List[ShareIssuance]:
+        """
+        Get issuances for a specific shareholder.
         Ordered by most recent first for better user experience.
 
         Args:
             shareholder_id: Shareholder ID
+            skip: Number of records to skip
+            limit: Maximum number of records to return
 
         Returns:
             List of share issuances
@@ -119,25 +320,76 @@ class ShareIssuanceRepository(BaseRepository[ShareIssuance, ShareIssuanceCreate,
         return (
             self.db.query(ShareIssuance)
             .filter(ShareIssuance.shareholder_id == shareholder_id)
-            .order_by(desc(ShareIssuance.issued_date))
+            .order_by(desc(ShareIssuance.issued_date), desc(ShareIssuance.id))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_page(self, skip: int = 0, limit: int = 100) -> List[ShareIssuance]:
+        """
+        Get issuances across all shareholders, most recent first, without related data.
+
+        Args:
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+
+        Returns:
+            List of share issuances
+        """
+        return (
+            self.db.query(ShareIssuance)
+            .order_by(desc(ShareIssuance.issued_date), desc(ShareIssuance.id))
+            .offset(skip)
+            .limit(limit)
             .all()
         )
 
-    def get_all_with_shareholders(self) -> List[ShareIssuance]:
+    def get_by_user(self, user_id: int, skip: int = 0, limit: int = 100) -> List[ShareIssuance]:
         """
-        Get all issuances with shareholder data.
-        Optimized for admin dashboard with single query.
+        Get issuances of the shareholder owned by a user, in one query.
+
+        Args:
+            user_id: User ID
+            skip: Number of records to skip
+            limit: Maximum number of records to return
 
         Returns:
-            List of issuances with loaded shareholder data
+            List of share issuances, most recent first
         """
+        shareholder_id = (
+            select(ShareholderProfile.id)
+            .where(ShareholderProfile.user_id == user_id)
+            .scalar_subquery()
+        )
         return (
             self.db.query(ShareIssuance)
-            .options(joinedload(ShareIssuance.shareholder).joinedload(ShareholderProfile.user))
-            .order_by(desc(ShareIssuance.issued_date))
+            .filter(ShareIssuance.shareholder_id == shareholder_id)
+            .order_by(desc(ShareIssuance.issued_date), desc(ShareIssuance.id))
+            .offset(skip)
+            .limit(limit)
             .all()
         )
 
+    def get_for_user(self, issuance_id: int, user_id: int) -> Optional[ShareIssuance]:
+        """
+        Get an issuance only if it belongs to the shareholder owned by a user.
+        Ownership is checked in the same query.
+
+        Args:
+            issuance_id: Issuance ID
+            user_id: User ID
+
+        Returns:
+            ShareIssuance or None if not found or owned by someone else
+        """
+        return (
+            self.db.query(ShareIssuance)
+            .join(ShareholderProfile, ShareIssuance.shareholder_id == ShareholderProfile.id)
+            .filter(ShareIssuance.id == issuance_id, ShareholderProfile.user_id == user_id)
+            .first()
+        )
+
     def get_by_certificate_number(self, certificate_number: str) -> Optional[ShareIssuance]:
         """
         Get issuance by certificate number.
@@ -155,6 +407,42 @@ class ShareIssuanceRepository(BaseRepository[ShareIssuance, ShareIssuanceCreate,
             .first()
         )
 
+    def backfill_certificate_counters(self) -> bool:
+        """
+        Seed cert_counters from existing certificate numbers if it is still empty,
+        i.e. certificates issued before the counter table existed.
+        Each year continues after its highest CERT-YYYY-NNNNNN sequence; once any
+        counter row exists the reservations own the table and this is a no-op.
+
+        Returns:
+            True if any counter rows were inserted
+        """
+        is_postgresql = self.db.get_bind().dialect.name == "postgresql"
+        if is_postgresql:
+            # Workers starting together take turns; the lock is released with the transaction
+            self.db.execute(select(func.pg_advisory_xact_lock(_CERT_COUNTER_BACKFILL_LOCK_ID)))
+
+        if self.db.scalar(select(CertificateCounter.year).limit(1)) is not None:
+            self.db.rollback()
+            return False
+
+        # Inline offsets rather than bound parameters, so GROUP BY matches the selected expression
+        number = ShareIssuance.certificate_number
+        year = cast(func.substr(number, literal_column("6"), literal_column("4")), Integer)
+        sequence = cast(func.substr(number, literal_column("11")), Integer)
+
+        dialect = postgresql if is_postgresql else sqlite
+        inserted = self.db.execute(
+            dialect.insert(CertificateCounter).from_select(
+                ["year", "next_val"],
+                select(year, func.max(sequence) + 1)
+                .where(number.like("CERT-____-%"))
+                .group_by(year)
+            ).on_conflict_do_nothing(index_elements=[CertificateCounter.year])
+        ).rowcount
+        self.db.commit()
+        return inserted > 0
+
     def generate_certificate_number(self) -> str:
         """
         Generate unique certificate number.
@@ -163,24 +451,32 @@ class ShareIssuanceRepository(BaseRepository[ShareIssuance, ShareIssuanceCreate,
         Returns:
             Unique certificate number
         """
-        from datetime import datetime
+        return self.reserve_certificate_numbers(1)[0]
 
-        current_year = datetime.now().year
+    def reserve_certificate_numbers(self, count: int) -> List[str]:
+        """
+        Reserve a block of consecutive certificate numbers with a single statement.
+        Format: CERT-YYYY-NNNNNN (year + 6-digit sequence)
 
-        # Get the highest certificate number for current year
-        last_cert = (
-            self.db.query(ShareIssuance)
-            .filter(ShareIssuance.certificate_number.like(f'CERT-{current_year}-%'))
-            .order_by(desc(ShareIssuance.certificate_number))
-            .first()
-        )
+        Args:
+            count: Number of certificate numbers to reserve
 
-        if last_cert:
-            # Extract sequence number and increment
-            last_sequence = int(last_cert.certificate_number.split('-')[-1])
-            next_sequence = last_sequence + 1
-        else:
-            # First certificate of the year
-            next_sequence = 1
+        Returns:
+            Unique certificate numbers, in sequence order
+        """
+        current_year = datetime.now().year
+
+        # Atomic per-year counter: the row lock serialises concurrent issuances
+        # until their transaction commits, so two callers never get the same number
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(CertificateCounter).values(year=current_year, next_val=count + 1)
+        first_sequence = self.db.execute(
+            statement
+            .on_conflict_do_update(
+                index_elements=[CertificateCounter.year],
+                set_={"next_val": CertificateCounter.next_val + count}
+            )
+            .returning(CertificateCounter.next_val - count)
+        ).scalar_one()
 
-        return f"CERT-{current_year}-{next_sequence:06d}"
+        return [f"CERT-{current_year}-{sequence:06d}" for sequence in range(first_sequence, first_sequence + count)]
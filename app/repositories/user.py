@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from app.models.user import User, UserRole
 from app.repositories.base import BaseRepository
 from app.schemas.user import UserCreate, UserResponse
+from app.utils.security import get_password_hash, password_needs_rehash, verify_password
 
 
 class UserRepository(BaseRepository[User, UserCreate, UserResponse]):
@@ -67,10 +68,12 @@ class UserRepository(BaseRepository[User, UserCreate, UserResponse]):
         Returns:
             User instance if authentication successful, None otherwise
         """
-        from app.utils.security import verify_password
-
         user = self.get_by_email(email)
         if user and user.is_active and verify_password(password, user.hashed_password):
+            # Migrate bcrypt (or outdated Argon2) hashes while the plain password is at hand
+            if password_needs_rehash(user.hashed_password):
+                user.hashed_password = get_password_hash(password)
+                self.db.commit()
             return user
         return None
 
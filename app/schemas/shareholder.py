@@ -1,8 +1,12 @@
+import re
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional, List
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+# Compiled once at import instead of on every validation
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
 
 class ShareholderProfileBase(BaseModel):
@@ -16,12 +20,11 @@ class ShareholderProfileCreate(ShareholderProfileBase):
     """Schema for creating shareholder profiles"""
     email: str = Field(..., description="Email for user account creation")
 
-    @validator('email')
-    def validate_email(cls, v):
+    @field_validator('email')
+    @classmethod
+    def validate_email(cls, v: str) -> str:
         """Validate email format"""
-        import re
-        email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_regex, v):
+        if not _EMAIL_RE.match(v):
             raise ValueError('Invalid email format')
         return v.lower()
 
@@ -36,7 +39,7 @@ class ShareholderProfileUpdate(BaseModel):
 class ShareIssuanceBase(BaseModel):
     """Base share issuance schema"""
     number_of_shares: int = Field(..., gt=0, description="Number of shares (must be positive)")
-    price_per_share: Decimal = Field(..., gt=0, description="Price per share (must be positive)")
+    price_per_share: Decimal = Field(..., gt=0, decimal_places=2, description="Price per share (must be positive)")
     notes: Optional[str] = Field(None, description="Additional notes")
 
 
@@ -45,6 +48,12 @@ class ShareIssuanceCreate(ShareIssuanceBase):
     shareholder_id: int = Field(..., gt=0, description="Shareholder ID")
 
 
+class ShareIssuanceBulkCreate(BaseModel):
+    """Schema for creating many share issuances at once (e.g. a cap table import)"""
+    issuances: List[ShareIssuanceCreate] = Field(..., min_length=1, max_length=1000,
+                                                 description="Issuances to create")
+
+
 class ShareIssuanceResponse(ShareIssuanceBase):
     """Schema for share issuance responses"""
     id: int
@@ -54,8 +63,7 @@ class ShareIssuanceResponse(ShareIssuanceBase):
     total_value: Decimal
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ShareholderProfileResponse(ShareholderProfileBase):
@@ -67,8 +75,7 @@ class ShareholderProfileResponse(ShareholderProfileBase):
     updated_at: Optional[datetime]
     share_issuances: List[ShareIssuanceResponse] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ShareholderSummary(BaseModel):
@@ -80,5 +87,4 @@ class ShareholderSummary(BaseModel):
     total_value: Decimal
     issuance_count: int
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -4,7 +4,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from app.models.user import UserRole
 
@@ -32,9 +32,8 @@ class UserResponse(UserBase):
     is_active: bool
     created_at: datetime
 
-    class Config:
-        # Enable ORM mode for SQLAlchemy integration
-        from_attributes = True
+    # Enable ORM mode for SQLAlchemy integration
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
@@ -1,10 +1,13 @@
 # Audit service for comprehensive event logging
 # Provides standardized audit trail across the application
 
+from typing import List
+
 from sqlalchemy.orm import Session
 
 from app.models.audit import AuditEvent
 from app.repositories.audit import AuditRepository
+from app.services.audit_queue import audit_queue
 
 
 class AuditService:
@@ -21,6 +24,7 @@ class AuditService:
                            ip_address: str = None) -> AuditEvent:
         """
         Log share issuance event with comprehensive details.
+        Staged in the session - written by the same commit as the issuance.
 
         Args:
             issuance: Share issuance object
@@ -29,7 +33,47 @@ class AuditService:
             ip_address: Client IP address
 
         Returns:
-            Created audit event
+            Pending audit event
+        """
+        return self.audit_repo.stage_event(
+            **self._share_issuance_event(issuance, shareholder, issued_by_user_id, ip_address)
+        )
+
+    def log_share_issuances_bulk(self, issuances: List, shareholders: List, issued_by_user_id: int,
+                                 ip_address: str = None) -> List[AuditEvent]:
+        """
+        Log several share issuances in the issuances' own transaction.
+        The staged events are written by the caller's commit.
+
+        Args:
+            issuances: Share issuance objects
+            shareholders: Shareholder profile for each issuance, in the same order
+            issued_by_user_id: ID of admin who issued shares
+            ip_address: Client IP address
+
+        Returns:
+            Pending audit events
+        """
+        return [
+            self.audit_repo.stage_event(
+                **self._share_issuance_event(issuance, shareholder, issued_by_user_id, ip_address)
+            )
+            for issuance, shareholder in zip(issuances, shareholders, strict=True)
+        ]
+
+    @staticmethod
+    def _share_issuance_event(issuance, shareholder, issued_by_user_id: int, ip_address: str = None) -> dict:
+        """
+        Build the audit event for a share issuance.
+
+        Args:
+            issuance: Share issuance object
+            shareholder: Shareholder profile object
+            issued_by_user_id: ID of admin who issued shares
+            ip_address: Client IP address
+
+        Returns:
+            Event fields as accepted by AuditRepository.stage_event
         """
         event_data = {
             "issuance_id": issuance.id,
@@ -46,18 +90,19 @@ class AuditService:
         description = (f"Issued {issuance.number_of_shares:,} shares to {shareholder.full_name} "
                        f"(Certificate: {issuance.certificate_number})")
 
-        return self.audit_repo.create_event(
-            event_type="share_issuance",
-            description=description,
-            user_id=issued_by_user_id,
-            ip_address=ip_address,
-            event_data=event_data
-        )
+        return {
+            "event_type": "share_issuance",
+            "description": description,
+            "user_id": issued_by_user_id,
+            "ip_address": ip_address,
+            "event_data": event_data
+        }
 
     def log_shareholder_creation(self, shareholder, user, created_by_user_id: int,
                                  ip_address: str = None) -> AuditEvent:
         """
         Log shareholder creation event.
+        Staged in the session - written by the same commit as the shareholder.
 
         Args:
             shareholder: Created shareholder profile
@@ -66,7 +111,7 @@ class AuditService:
             ip_address: Client IP address
 
         Returns:
-            Created audit event
+            Pending audit event
         """
         event_data = {
             "shareholder_id": shareholder.id,
@@ -79,7 +124,7 @@ class AuditService:
 
         description = f"Created new shareholder: {shareholder.full_name} ({user.email})"
 
-        return self.audit_repo.create_event(
+        return self.audit_repo.stage_event(
             event_type="shareholder_created",
             description=description,
             user_id=created_by_user_id,
@@ -88,17 +133,15 @@ class AuditService:
         )
 
     def log_certificate_download(self, issuance_id: int, user_id: int,
-                                 ip_address: str = None) -> AuditEvent:
+                                 ip_address: str = None) -> None:
         """
         Log certificate download event.
+        Queued and written in the background by the audit writer.
 
         Args:
             issuance_id: Share issuance ID
             user_id: User who downloaded certificate
             ip_address: Client IP address
-
-        Returns:
-            Created audit event
         """
         event_data = {
             "issuance_id": issuance_id,
@@ -107,26 +150,24 @@ class AuditService:
 
         description = f"Downloaded share certificate for issuance ID: {issuance_id}"
 
-        return self.audit_repo.create_event(
-            event_type="certificate_download",
-            description=description,
-            user_id=user_id,
-            ip_address=ip_address,
-            event_data=event_data
-        )
+        audit_queue.enqueue({
+            "event_type": "certificate_download",
+            "description": description,
+            "user_id": user_id,
+            "ip_address": ip_address,
+            "event_data": event_data
+        })
 
     def log_dashboard_access(self, user_id: int, dashboard_type: str,
-                             ip_address: str = None) -> AuditEvent:
+                             ip_address: str = None) -> None:
         """
         Log dashboard access for security monitoring.
+        Queued and written in the background by the audit writer.
 
         Args:
             user_id: User accessing dashboard
             dashboard_type: Type of dashboard (admin or shareholder)
             ip_address: Client IP address
-
-        Returns:
-            Created audit event
         """
         event_data = {
             "dashboard_type": dashboard_type,
@@ -135,10 +176,10 @@ class AuditService:
 
         description = f"Accessed {dashboard_type} dashboard"
 
-        return self.audit_repo.create_event(
-            event_type="dashboard_access",
-            description=description,
-            user_id=user_id,
-            ip_address=ip_address,
-            event_data=event_data
-        )
+        audit_queue.enqueue({
+            "event_type": "dashboard_access",
+            "description": description,
+            "user_id": user_id,
+            "ip_address": ip_address,
+            "event_data": event_data
+        })
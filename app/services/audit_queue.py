@@ -0,0 +1,149 @@
+# Write-behind queue for fire-and-forget audit events
+# Request handlers enqueue events; a background thread writes them in batches
+
+import logging
+import queue
+import threading
+import time
+from typing import List, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.repositories.audit import AuditRepository
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # Sentinel telling the writer thread to flush and exit
+
+
+class AuditEventQueue:
+    """
+    Bounded in-process queue of audit events drained by a single writer thread.
+    Events are written with one bulk INSERT per batch, either every
+    `flush_interval` seconds or as soon as `batch_size` events are waiting.
+
+    Only for events that don't have to be part of the business transaction
+    (dashboard access, certificate downloads, successful logins). When the queue is full
+    new events are dropped with a warning rather than blocking the request.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False  # Set by stop(); enqueue then never restarts the writer
+
+    def start(self) -> None:
+        """Start the writer thread if it is not already running"""
+        with self._lock:
+            self._stopped = False
+            self._start_locked()
+
+    def _start_locked(self) -> None:
+        # Caller holds self._lock
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Flush every queued event and stop the writer thread.
+
+        Args:
+            timeout: Maximum seconds to wait for the final flush
+        """
+        with self._lock:
+            self._stopped = True
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.warning("Audit queue still full at shutdown - pending events may be lost")
+                return
+            thread.join(timeout)
+
+        # Events that raced in behind the stop sentinel
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._write(leftover)
+
+    def enqueue(self, event: dict) -> None:
+        """
+        Queue an audit event for writing; never blocks.
+        After stop() the event is written inline instead, as no writer will drain the queue.
+
+        Args:
+            event: Event fields as accepted by AuditRepository.create_event
+        """
+        if self._thread is None:
+            with self._lock:
+                stopped = self._stopped
+                if not stopped:
+                    self._start_locked()
+            if stopped:
+                self._write([event])
+                return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            logger.warning("Audit queue full - dropped %s event (%d dropped so far)",
+                           event.get("event_type"), dropped)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            # Collect a batch until it is full or the flush interval has passed
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: List[dict]) -> None:
+        db = SessionLocal()
+        try:
+            AuditRepository(db).create_events_bulk(batch)
+        except Exception as e:
+            db.rollback()
+            logger.error("Failed to write %d audit events: %s", len(batch), e)
+        finally:
+            db.close()
+
+
+# Process-wide queue, started by the application lifespan
+audit_queue = AuditEventQueue(
+    max_size=settings.audit_queue_max_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_ms / 1000
+)
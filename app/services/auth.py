@@ -1,8 +1,10 @@
 # Authentication service following Single Responsibility Principle
 # Handles all authentication-related business logic
 
+import threading
 from datetime import timedelta
 
+from cachetools import TTLCache
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
@@ -10,7 +12,13 @@ from app.config import settings
 from app.repositories.audit import AuditRepository
 from app.repositories.user import UserRepository
 from app.schemas.user import UserLogin, Token
-from app.utils.security import create_access_token
+from app.services.audit_queue import audit_queue
+from app.utils.security import create_access_token, verify_token
+
+# Users resolved during token validation, keyed by email (the token subject).
+# Every token of the same user shares one lookup; the token-level cache lives in app.api.deps.
+_user_cache = TTLCache(maxsize=5000, ttl=settings.user_cache_ttl_seconds)
+_user_cache_lock = threading.Lock()
 
 
 class AuthService:
@@ -42,13 +50,14 @@ class AuthService:
         user = self.user_repo.authenticate_user(login_data.email, login_data.password)
 
         if not user:
-            # Log failed authentication attempt
-            self.audit_repo.create_event(
-                event_type="login_failed",
-                description=f"Failed login attempt for email: {login_data.email}",
-                ip_address=ip_address,
-                event_data={"email": login_data.email}
-            )
+            # Log failed authentication attempt - written before responding, never through
+            # the lossy queue: this is the trail a credential-stuffing run must leave
+            self.audit_repo.create_events_bulk([{
+                "event_type": "login_failed",
+                "description": f"Failed login attempt for email: {login_data.email}",
+                "ip_address": ip_address,
+                "event_data": {"email": login_data.email}
+            }])
 
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,14 +72,14 @@ class AuthService:
             expires_delta=access_token_expires
         )
 
-        # Log successful authentication
-        self.audit_repo.create_event(
-            event_type="login_success",
-            description=f"Successful login for user: {user.email}",
-            user_id=user.id,
-            ip_address=ip_address,
-            event_data={"email": user.email, "role": user.role.value}
-        )
+        # Log successful authentication (queued, written in the background)
+        audit_queue.enqueue({
+            "event_type": "login_success",
+            "description": f"Successful login for user: {user.email}",
+            "user_id": user.id,
+            "ip_address": ip_address,
+            "event_data": {"email": user.email, "role": user.role.value}
+        })
         return Token(
             access_token=access_token,
             token_type="bearer",
@@ -90,8 +99,6 @@ class AuthService:
         Raises:
             HTTPException: If token is invalid or user not found
         """
-        from app.utils.security import verify_token
-
         # Verify token
         payload = verify_token(token)
         if payload is None:
@@ -110,7 +117,12 @@ class AuthService:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        # Get user from database
+        # Get user from cache or database
+        with _user_cache_lock:
+            cached = _user_cache.get(email)
+        if cached is not None:
+            return dict(cached)
+
         user = self.user_repo.get_by_email(email)
         if user is None or not user.is_active:
             raise HTTPException(
@@ -119,9 +131,12 @@ class AuthService:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        return {
+        user_data = {
             "id": user.id,
             "email": user.email,
             "role": user.role,
             "is_active": user.is_active
         }
+        with _user_cache_lock:
+            _user_cache[email] = user_data
+        return dict(user_data)
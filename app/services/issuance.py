@@ -1,16 +1,24 @@
 # Share issuance service handling complex business logic
 # Central place for share issuance rules and validation
 
+import logging
 from decimal import Decimal
 from typing import List, Optional
 
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.repositories.shareholder import ShareholderRepository, ShareIssuanceRepository
-from app.schemas.shareholder import ShareIssuanceCreate, ShareIssuanceResponse
+from app.schemas.shareholder import ShareIssuanceBulkCreate, ShareIssuanceCreate, ShareIssuanceResponse
 from app.services.audit import AuditService
 
+logger = logging.getLogger(__name__)
+
+# Validates a whole page of ORM issuances in one pydantic-core call
+_ISSUANCE_LIST_ADAPTER = TypeAdapter(List[ShareIssuanceResponse])
+
 
 class ShareIssuanceService:
     """
@@ -75,62 +83,149 @@ class ShareIssuanceService:
             "notes": issuance_data.notes
         }
 
-        issuance = self.issuance_repo.create(issuance_dict)
+        issuance = self.issuance_repo.create(issuance_dict, commit=False)
 
-        # Log share issuance for audit trail
+        # Log share issuance for audit trail - committed together with the issuance
         self.audit_service.log_share_issuance(
             issuance=issuance,
             shareholder=shareholder,
             issued_by_user_id=issued_by_user_id,
             ip_address=ip_address
         )
+        self._commit()
+        self.db.refresh(issuance)
 
         # Simulate email notification (bonus feature)
         self._send_issuance_notification(shareholder, issuance)
 
-        return ShareIssuanceResponse.from_orm(issuance)
+        return ShareIssuanceResponse.model_validate(issuance)
 
-    def get_all_issuances(self) -> List[ShareIssuanceResponse]:
+    def create_share_issuances_bulk(self, bulk_data: ShareIssuanceBulkCreate,
+                                    issued_by_user_id: int, ip_address: str = None) -> List[ShareIssuanceResponse]:
         """
-        Get all share issuances for admin view.
-        Includes shareholder information for context.
+        Create many share issuances in one transaction, e.g. when importing a cap table.
+        Applies the same business rules as create_share_issuance; either every
+        issuance is created or none is.
+
+        Args:
+            bulk_data: Share issuances to create
+            issued_by_user_id: ID of admin issuing shares
+            ip_address: Client IP for audit logging
 
         Returns:
-            List of all share issuances
+            Created share issuances, in input order
+
+        Raises:
+            HTTPException: If validation fails for any issuance
         """
-        issuances = self.issuance_repo.get_all_with_shareholders()
-        return [ShareIssuanceResponse.from_orm(issuance) for issuance in issuances]
+        items = bulk_data.issuances
+
+        # Validate business rules before touching the database
+        for issuance_data in items:
+            self._validate_issuance_data(issuance_data)
+
+        # Load every referenced shareholder at once
+        shareholder_ids = {issuance_data.shareholder_id for issuance_data in items}
+        shareholders = {
+            shareholder.id: shareholder
+            for shareholder in self.shareholder_repo.get_many_with_users(list(shareholder_ids))
+        }
+
+        missing = sorted(shareholder_ids - shareholders.keys())
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Shareholder not found: {', '.join(map(str, missing))}"
+            )
+
+        if any(not shareholder.user.is_active for shareholder in shareholders.values()):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot issue shares to inactive shareholder"
+            )
 
-    def get_issuances_by_shareholder(self, shareholder_id: int) -> List[ShareIssuanceResponse]:
+        # One counter update reserves every certificate number
+        certificate_numbers = self.issuance_repo.reserve_certificate_numbers(len(items))
+
+        issuances = self.issuance_repo.create_bulk([
+            {
+                "shareholder_id": issuance_data.shareholder_id,
+                "number_of_shares": issuance_data.number_of_shares,
+                "price_per_share": issuance_data.price_per_share,
+                "certificate_number": certificate_number,
+                "notes": issuance_data.notes
+            }
+            for issuance_data, certificate_number in zip(items, certificate_numbers)
+        ], commit=False)
+        issuance_shareholders = [shareholders[issuance.shareholder_id] for issuance in issuances]
+
+        # Log all issuances for audit trail - written by the issuances' own commit
+        self.audit_service.log_share_issuances_bulk(
+            issuances=issuances,
+            shareholders=issuance_shareholders,
+            issued_by_user_id=issued_by_user_id,
+            ip_address=ip_address
+        )
+        self._commit()
+
+        # The commit expired the new rows and their shareholders - reload each set with one query
+        self.issuance_repo.get_many_by_ids([issuance.id for issuance in issuances])
+        self.shareholder_repo.get_many_with_users(list(shareholder_ids))
+        responses = _ISSUANCE_LIST_ADAPTER.validate_python(issuances)
+
+        # Simulate email notifications (bonus feature)
+        for issuance, shareholder in zip(issuances, issuance_shareholders):
+            self._send_issuance_notification(shareholder, issuance)
+
+        return responses
+
+    def get_all_issuances(self, skip: int = 0, limit: int = 100) -> List[ShareIssuanceResponse]:
+        """
+        Get share issuances for admin view, one page at a time.
+
+        Args:
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+
+        Returns:
+            List of share issuances
+        """
+        # The response carries no shareholder fields, so nothing related is loaded
+        issuances = self.issuance_repo.get_page(skip=skip, limit=limit)
+        return _ISSUANCE_LIST_ADAPTER.validate_python(issuances)
+
+    def get_issuances_by_shareholder(self, shareholder_id: int, skip: int = 0,
+                                     limit: int = 100) -> List[ShareIssuanceResponse]:
         """
         Get share issuances for specific shareholder.
 
         Args:
             shareholder_id: Shareholder ID
+            skip: Number of records to skip
+            limit: Maximum number of records to return
 
         Returns:
             List of shareholder's issuances
         """
-        issuances = self.issuance_repo.get_by_shareholder(shareholder_id)
-        return [ShareIssuanceResponse.from_orm(issuance) for issuance in issuances]
+        issuances = self.issuance_repo.get_by_shareholder(shareholder_id, skip=skip, limit=limit)
+        return _ISSUANCE_LIST_ADAPTER.validate_python(issuances)
 
-    def get_issuances_by_user(self, user_id: int) -> List[ShareIssuanceResponse]:
+    def get_issuances_by_user(self, user_id: int, skip: int = 0, limit: int = 100) -> List[ShareIssuanceResponse]:
         """
         Get share issuances for shareholder by user ID.
         Used for shareholder dashboard.
 
         Args:
             user_id: User ID
+            skip: Number of records to skip
+            limit: Maximum number of records to return
 
         Returns:
             List of user's share issuances
         """
-        # Get shareholder profile first
-        shareholder = self.shareholder_repo.get_by_user_id(user_id)
-        if not shareholder:
-            return []
-
-        return self.get_issuances_by_shareholder(shareholder.id)
+        # Profile lookup folded into the issuance query as a subquery
+        issuances = self.issuance_repo.get_by_user(user_id, skip=skip, limit=limit)
+        return _ISSUANCE_LIST_ADAPTER.validate_python(issuances)
 
     def get_issuance_details(self, issuance_id: int, user_id: int, user_role: str) -> Optional[ShareIssuanceResponse]:
         """
@@ -144,21 +239,16 @@ class ShareIssuanceService:
         Returns:
             Issuance details if authorized, None otherwise
         """
-        issuance = self.issuance_repo.get(issuance_id)
-        if not issuance:
-            return None
-
         # Admin can access all issuances
         if user_role == "admin":
-            return ShareIssuanceResponse.from_orm(issuance)
+            issuance = self.issuance_repo.get(issuance_id)
+        # Shareholders can only access their own issuances - checked in the same query
+        elif user_role == "shareholder":
+            issuance = self.issuance_repo.get_for_user(issuance_id, user_id)
+        else:
+            issuance = None
 
-        # Shareholders can only access their own issuances
-        if user_role == "shareholder":
-            shareholder = self.shareholder_repo.get_by_user_id(user_id)
-            if shareholder and issuance.shareholder_id == shareholder.id:
-                return ShareIssuanceResponse.from_orm(issuance)
-
-        return None
+        return ShareIssuanceResponse.model_validate(issuance) if issuance else None
 
     def _validate_issuance_data(self, issuance_data: ShareIssuanceCreate) -> None:
         """
@@ -199,6 +289,14 @@ class ShareIssuanceService:
                 detail="Price per share exceeds maximum allowed value"
             )
 
+    def _commit(self) -> None:
+        """Commit the issuance transaction, rolling back on constraint violations"""
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise
+
     def _send_issuance_notification(self, shareholder, issuance) -> None:
         """
         Simulate sending email notification to shareholder.
@@ -218,8 +316,8 @@ class ShareIssuanceService:
             "certificate_number": issuance.certificate_number
         }
 
-        # Log notification instead of sending actual email
-        print(f"EMAIL NOTIFICATION: {notification_data}")
+        # Log notification instead of sending actual email - formatted and written by the log listener thread
+        logger.info("EMAIL NOTIFICATION: %s", notification_data)
 
         # In production, you would call email service here:
         # email_service.send_share_certificate_notification(notification_data)
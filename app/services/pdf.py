@@ -1,10 +1,19 @@
 # PDF generation service using ReportLab
 # Single responsibility: Generate share certificates
 
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
-from typing import Optional
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
 
+from cachetools import LRUCache
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.pagesizes import A4
@@ -16,6 +25,80 @@ from sqlalchemy.orm import Session
 from app.config import settings
 from app.repositories.shareholder import ShareIssuanceRepository
 
+logger = logging.getLogger(__name__)
+
+# Size of the chunks sent to the client when streaming a certificate
+PDF_CHUNK_SIZE = 32 * 1024
+
+# Bump whenever the certificate layout changes - cached PDFs of older templates are then ignored
+CERTIFICATE_TEMPLATE_VERSION = 1
+
+# Issuances are immutable, so a rendered certificate never goes stale.
+# Recently rendered PDFs are kept in memory, bounded by their total size in bytes.
+_certificate_cache = LRUCache(maxsize=settings.certificate_cache_max_bytes, getsizeof=len)
+_certificate_cache_lock = threading.Lock()
+
+# ReportLab layout is pure Python and holds the GIL, so certificates are rendered in
+# worker processes. Created on first use; spawned rather than forked because the
+# parent runs background threads (log listener, audit writer).
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the render process pool, or None when rendering in-process is configured"""
+    global _pdf_pool
+    workers = settings.pdf_render_processes
+    if workers == 0:
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_pool
+
+
+def _disk_cache_path(issuance) -> Optional[Path]:
+    """Location of an issuance's rendered certificate in the disk cache, None when disabled"""
+    if not settings.certificate_cache_dir:
+        return None
+    created = int(issuance.created_at.timestamp())
+    return Path(settings.certificate_cache_dir) / f"{issuance.id}-{created}-v{CERTIFICATE_TEMPLATE_VERSION}.pdf"
+
+
+def _read_disk_cache(path: Path) -> Optional[bytes]:
+    try:
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def _write_disk_cache(path: Path, pdf_bytes: bytes) -> None:
+    # Write to a temporary file and rename, so readers never see a partial PDF
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(pdf_bytes)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning("Could not cache certificate at %s: %s", path, e)
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the render worker processes, if they were started"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        pool, _pdf_pool = _pdf_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
 
 class PDFService:
     """
@@ -26,224 +109,320 @@ class PDFService:
     def __init__(self, db: Session):
         self.db = db
         self.issuance_repo = ShareIssuanceRepository(db)
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
 
-    def generate_share_certificate(self, issuance_id: int) -> Optional[BytesIO]:
+    def generate_share_certificate(self, issuance_id: int) -> Optional[BinaryIO]:
         """
         Generate PDF share certificate for given issuance.
+        Served from the in-memory cache, then the disk cache, when the certificate was
+        rendered before; otherwise rendered in a worker process - blocks, so call from a
+        worker thread.
 
         Args:
             issuance_id: Share issuance ID
 
         Returns:
-            BytesIO buffer containing PDF data, None if issuance not found
+            File object containing PDF data positioned at start, None if issuance not found
         """
         # Get issuance with shareholder data
         issuance = self.issuance_repo.get(issuance_id)
         if not issuance:
             return None
 
-        # Create PDF buffer
-        buffer = BytesIO()
-
-        # Create PDF document
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72,
-            title=f"Issuance Certificate {issuance.certificate_number}"
-        )
-
-        # Build certificate content
-        story = self._build_certificate_content(issuance)
-
-        # Generate PDF
-        doc.build(story, onFirstPage=self._add_watermark, onLaterPages=self._add_watermark)
-
-        # Return buffer positioned at start
-        buffer.seek(0)
-        return buffer
-
-    def _setup_custom_styles(self) -> None:
-        """Setup custom paragraph styles for certificate"""
-
-        # Certificate title style
-        self.title_style = ParagraphStyle(
-            'CertificateTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue,
-            fontName='Helvetica-Bold'
-        )
-
-        # Company name style
-        self.company_style = ParagraphStyle(
-            'CompanyName',
-            parent=self.styles['Heading2'],
-            fontSize=18,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=colors.darkgreen,
-            fontName='Helvetica-Bold'
-        )
-
-        # Certificate body style
-        self.body_style = ParagraphStyle(
-            'CertificateBody',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            spaceAfter=12,
-            alignment=TA_LEFT,
-            fontName='Helvetica'
-        )
-
-        # Signature style
-        self.signature_style = ParagraphStyle(
-            'SignatureStyle',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            alignment=TA_CENTER,
-            fontName='Helvetica'
-        )
-
-    def _build_certificate_content(self, issuance) -> list:
+        cache_key = (issuance.id, issuance.created_at, CERTIFICATE_TEMPLATE_VERSION)
+        with _certificate_cache_lock:
+            pdf_bytes = _certificate_cache.get(cache_key)
+
+        if pdf_bytes is None:
+            disk_path = _disk_cache_path(issuance)
+            pdf_bytes = _read_disk_cache(disk_path) if disk_path else None
+
+            if pdf_bytes is None:
+                payload = self._certificate_payload(issuance)
+                pool = _get_pdf_pool()
+                # The request thread only waits on the worker, leaving the GIL to other requests
+                pdf_bytes = pool.submit(_render_pdf, payload).result() if pool else _render_pdf(payload)
+                if disk_path:
+                    _write_disk_cache(disk_path, pdf_bytes)
+
+            if len(pdf_bytes) <= _certificate_cache.maxsize:
+                with _certificate_cache_lock:
+                    _certificate_cache[cache_key] = pdf_bytes
+
+        return BytesIO(pdf_bytes)
+
+    @staticmethod
+    def _certificate_payload(issuance) -> dict:
         """
-        Build the content structure for the share certificate.
+        Extract the plain data a certificate is rendered from.
+        Picklable, so it can be sent to a render worker process.
 
         Args:
             issuance: Share issuance object with loaded shareholder data
 
         Returns:
-            List of Platypus flowables for PDF generation
+            Certificate fields as a dictionary
         """
-        story = []
+        return {
+            "certificate_number": issuance.certificate_number,
+            "issued_date": issuance.issued_date,
+            "shareholder_name": issuance.shareholder.full_name,
+            "number_of_shares": issuance.number_of_shares,
+            "price_per_share": issuance.price_per_share,
+            "total_value": issuance.total_value,
+            "notes": issuance.notes
+        }
+
+    @staticmethod
+    def iter_certificate_chunks(pdf_file: BinaryIO) -> Iterator[bytes]:
+        """
+        Stream a generated certificate in fixed-size chunks.
+        The file is closed once fully read or when the client goes away.
 
-        # Add spacer at top
-        story.append(Spacer(1, 0.5 * inch))
+        Args:
+            pdf_file: File object returned by generate_share_certificate
 
-        # Company name
-        story.append(Paragraph(settings.company_name, self.company_style))
+        Yields:
+            Chunks of PDF data
+        """
+        try:
+            while chunk := pdf_file.read(PDF_CHUNK_SIZE):
+                yield chunk
+        finally:
+            pdf_file.close()
+
+
+# Static table styles, shared by every certificate
+_SHARE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+_SIGNATURE_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 2), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('VALIGN', (0, 0), (-1, -1), 'BOTTOM'),
+])
+
+
+@lru_cache(maxsize=1)
+def _certificate_styles() -> dict:
+    """Build the certificate paragraph styles once per process"""
+    styles = getSampleStyleSheet()
+
+    # Certificate title style
+    title_style = ParagraphStyle(
+        'CertificateTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue,
+        fontName='Helvetica-Bold'
+    )
+
+    # Company name style
+    company_style = ParagraphStyle(
+        'CompanyName',
+        parent=styles['Heading2'],
+        fontSize=18,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.darkgreen,
+        fontName='Helvetica-Bold'
+    )
+
+    # Certificate body style
+    body_style = ParagraphStyle(
+        'CertificateBody',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceAfter=12,
+        alignment=TA_LEFT,
+        fontName='Helvetica'
+    )
+
+    # Signature style
+    signature_style = ParagraphStyle(
+        'SignatureStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=6,
+        alignment=TA_CENTER,
+        fontName='Helvetica'
+    )
+
+    return {
+        "title": title_style,
+        "company": company_style,
+        "body": body_style,
+        "signature": signature_style
+    }
+
+
+def _render_pdf(certificate: dict) -> bytes:
+    """
+    Render a share certificate PDF.
+    Module-level and fed plain data only, so it can run in a worker process.
 
-        # Certificate title
-        story.append(Paragraph("ISSUANCE CERTIFICATE", self.title_style))
+    Args:
+        certificate: Certificate fields from PDFService._certificate_payload
 
-        # Certificate number and date
-        # Continuing from app/services/pdf.py
+    Returns:
+        PDF document bytes
+    """
+    # Create PDF buffer
+    buffer = BytesIO()
+
+    # Create PDF document
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72,
+        title=f"Issuance Certificate {certificate['certificate_number']}"
+    )
+
+    # Build certificate content
+    story = _build_certificate_content(certificate)
+
+    # Generate PDF
+    doc.build(story, onFirstPage=_add_watermark, onLaterPages=_add_watermark)
+
+    return buffer.getvalue()
+
+
+def _build_certificate_content(certificate: dict) -> list:
+    """
+    Build the content structure for the share certificate.
+
+    Args:
+        certificate: Certificate fields from PDFService._certificate_payload
+
+    Returns:
+        List of Platypus flowables for PDF generation
+    """
+    styles = _certificate_styles()
+    story = []
 
-        cert_info = f"Certificate No: {issuance.certificate_number} | Issue Date: {issuance.issued_date.strftime('%B %d, %Y')}"
-        story.append(Paragraph(cert_info, self.body_style))
+    # Format each value once; the body text and the details table both use them
+    issue_date = certificate['issued_date'].strftime('%B %d, %Y')
+    number_of_shares = f"{certificate['number_of_shares']:,}"
+    price_per_share = f"${certificate['price_per_share']}"
 
-        story.append(Spacer(1, 0.3 * inch))
+    # Add spacer at top
+    story.append(Spacer(1, 0.5 * inch))
 
-        # Certificate body text
-        certificate_text = f"""
-                This is to certify that <b>{issuance.shareholder.full_name}</b> is the registered holder of 
-                <b>{issuance.number_of_shares:,} shares</b> of common stock of {settings.company_name}, 
-                each share having a par value of <b>${issuance.price_per_share}</b>.
-                """
-        story.append(Paragraph(certificate_text, self.body_style))
+    # Company name
+    story.append(Paragraph(settings.company_name, styles['company']))
 
+    # Certificate title
+    story.append(Paragraph("ISSUANCE CERTIFICATE", styles['title']))
+
+    # Certificate number and date
+    # Continuing from app/services/pdf.py
+
+    cert_info = f"Certificate No: {certificate['certificate_number']} | Issue Date: {issue_date}"
+    story.append(Paragraph(cert_info, styles['body']))
+
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Certificate body text
+    certificate_text = f"""
+            This is to certify that <b>{certificate['shareholder_name']}</b> is the registered holder of 
+            <b>{number_of_shares} shares</b> of common stock of {settings.company_name}, 
+            each share having a par value of <b>{price_per_share}</b>.
+            """
+    story.append(Paragraph(certificate_text, styles['body']))
+
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Share details table
+    share_data = [
+        ['Shareholder Name:', certificate['shareholder_name']],
+        ['Number of Shares:', number_of_shares],
+        ['Price per Share:', price_per_share],
+        ['Total Value:', f"${certificate['total_value']:,.2f}"],
+        ['Issue Date:', issue_date],
+    ]
+
+    share_table = Table(share_data, colWidths=[2 * inch, 3 * inch])
+    share_table.setStyle(_SHARE_TABLE_STYLE)
+
+    story.append(share_table)
+    story.append(Spacer(1, 0.4 * inch))
+
+    # Additional notes if any
+    if certificate['notes']:
+        story.append(Paragraph(f"<b>Notes:</b> {certificate['notes']}", styles['body']))
         story.append(Spacer(1, 0.2 * inch))
 
-        # Share details table
-        share_data = [
-            ['Shareholder Name:', issuance.shareholder.full_name],
-            ['Number of Shares:', f"{issuance.number_of_shares:,}"],
-            ['Price per Share:', f"${issuance.price_per_share}"],
-            ['Total Value:', f"${issuance.total_value:,.2f}"],
-            ['Issue Date:', issuance.issued_date.strftime('%B %d, %Y')],
-        ]
-
-        share_table = Table(share_data, colWidths=[2 * inch, 3 * inch])
-        share_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-
-        story.append(share_table)
-        story.append(Spacer(1, 0.4 * inch))
-
-        # Additional notes if any
-        if issuance.notes:
-            story.append(Paragraph(f"<b>Notes:</b> {issuance.notes}", self.body_style))
-            story.append(Spacer(1, 0.2 * inch))
-
-        # Signature section
-        story.append(Spacer(1, 0.5 * inch))
-
-        signature_data = [
-            ['', ''],
-            ['_' * 30, '_' * 30],
-            ['Company Secretary', 'Chief Executive Officer'],
-            [f'{settings.company_name}', f'{settings.company_name}']
-        ]
-
-        signature_table = Table(signature_data, colWidths=[2.5 * inch, 2.5 * inch])
-        signature_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 2), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'BOTTOM'),
-        ]))
-
-        story.append(signature_table)
-
-        # Footer disclaimer
-        story.append(Spacer(1, 0.5 * inch))
-        disclaimer = """
-                This certificate is evidence of ownership of the shares described herein and is transferable 
-                only on the books of the corporation by the holder hereof in person or by attorney upon 
-                surrender of this certificate properly endorsed.
-                """
-        story.append(Paragraph(disclaimer, self.signature_style))
-
-        return story
-
-    def _add_watermark(self, canvas, doc):
-        """
-        Add watermark and header/footer to each page.
+    # Signature section
+    story.append(Spacer(1, 0.5 * inch))
 
-        Args:
-            canvas: ReportLab canvas object
-            doc: Document template object
-        """
-        # Save canvas state
-        canvas.saveState()
-
-        # Add watermark
-        canvas.setFont('Helvetica-Bold', 60)
-        canvas.setFillColor(colors.lightgrey)
-        canvas.setFillAlpha(0.3)
-
-        # Calculate center position for watermark
-        page_width, page_height = A4
-        canvas.translate(page_width / 2, page_height / 2)
-        canvas.rotate(45)
-        canvas.drawCentredString(0, 0, "PROTECTED CERTIFICATE")
-
-        # Restore canvas state
-        canvas.restoreState()
-
-        # Add page border
-        canvas.setStrokeColor(colors.darkblue)
-        canvas.setLineWidth(2)
-        canvas.rect(36, 36, page_width - 72, page_height - 72)
-
-        # Add footer with generation timestamp
-        canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.grey)
-        footer_text = f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')} | {settings.company_name}"
-        canvas.drawString(72, 50, footer_text)
+    signature_data = [
+        ['', ''],
+        ['_' * 30, '_' * 30],
+        ['Company Secretary', 'Chief Executive Officer'],
+        [f'{settings.company_name}', f'{settings.company_name}']
+    ]
+
+    signature_table = Table(signature_data, colWidths=[2.5 * inch, 2.5 * inch])
+    signature_table.setStyle(_SIGNATURE_TABLE_STYLE)
+
+    story.append(signature_table)
+
+    # Footer disclaimer
+    story.append(Spacer(1, 0.5 * inch))
+    disclaimer = """
+            This certificate is evidence of ownership of the shares described herein and is transferable 
+            only on the books of the corporation by the holder hereof in person or by attorney upon 
+            surrender of this certificate properly endorsed.
+            """
+    story.append(Paragraph(disclaimer, styles['signature']))
+
+    return story
+
+def _add_watermark(canvas, doc):
+    """
+    Add watermark and header/footer to each page.
+
+    Args:
+        canvas: ReportLab canvas object
+        doc: Document template object
+    """
+    # Save canvas state
+    canvas.saveState()
+
+    # Add watermark
+    canvas.setFont('Helvetica-Bold', 60)
+    canvas.setFillColor(colors.lightgrey)
+    canvas.setFillAlpha(0.3)
+
+    # Calculate center position for watermark
+    page_width, page_height = A4
+    canvas.translate(page_width / 2, page_height / 2)
+    canvas.rotate(45)
+    canvas.drawCentredString(0, 0, "PROTECTED CERTIFICATE")
+
+    # Restore canvas state
+    canvas.restoreState()
+
+    # Add page border
+    canvas.setStrokeColor(colors.darkblue)
+    canvas.setLineWidth(2)
+    canvas.rect(36, 36, page_width - 72, page_height - 72)
+
+    # Add footer with generation timestamp
+    canvas.setFont('Helvetica', 8)
+    canvas.setFillColor(colors.grey)
+    footer_text = f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')} | {settings.company_name}"
+    canvas.drawString(72, 50, footer_text)
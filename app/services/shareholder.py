@@ -3,6 +3,7 @@
 
 import secrets
 import string
+from decimal import Decimal
 from typing import List, Optional
 
 from fastapi import HTTPException, status
@@ -21,6 +22,10 @@ from app.schemas.shareholder import (
 from app.schemas.user import UserCreate
 from app.utils.security import get_password_hash
 
+# Temporary passwords mix letters, digits, and symbols
+_PASSWORD_ALPHABET = string.ascii_letters + string.digits + "!@#$%^&*"
+_PASSWORD_BYTE_LIMIT = 256 - 256 % len(_PASSWORD_ALPHABET)
+
 
 class ShareholderService:
     """
@@ -72,12 +77,13 @@ class ShareholderService:
 
             # Hash password before storing
             hashed_password = get_password_hash(temp_password)
+            # User, profile and audit event are written by one commit
             user = self.user_repo.create({
                 "email": user_data.email.lower(),
                 "hashed_password": hashed_password,
                 "role": user_data.role,
                 "is_active": True
-            })
+            }, commit=False)
 
             # Create shareholder profile
             profile_data = {
@@ -87,10 +93,10 @@ class ShareholderService:
                 "address": shareholder_data.address
             }
 
-            shareholder = self.shareholder_repo.create(profile_data)
+            shareholder = self.shareholder_repo.create(profile_data, commit=False)
 
             # Log shareholder creation
-            self.audit_repo.create_event(
+            self.audit_repo.stage_event(
                 event_type="shareholder_created",
                 description=f"New shareholder created: {shareholder.full_name}",
                 user_id=created_by_user_id,
@@ -102,6 +108,7 @@ class ShareholderService:
                     "temporary_password": temp_password  # In production, send via secure channel
                 }
             )
+            self.db.commit()
 
             # Return shareholder with computed total_shares
             return ShareholderProfileResponse(
@@ -117,20 +124,25 @@ class ShareholderService:
             )
 
         except IntegrityError as e:
+            self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Database constraint violation"
             )
 
-    def get_all_shareholders_summary(self) -> List[ShareholderSummary]:
+    def get_all_shareholders_summary(self, skip: int = 0, limit: int = 100) -> List[ShareholderSummary]:
         """
-        Get summary of all shareholders for admin dashboard.
+        Get summary of all shareholders for admin dashboard, one page at a time.
         Optimized query returning calculated totals.
 
+        Args:
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+
         Returns:
             List of shareholder summaries with totals
         """
-        shareholders_data = self.shareholder_repo.get_all_with_totals()
+        shareholders_data = self.shareholder_repo.get_all_with_totals(skip=skip, limit=limit)
 
         return [
             ShareholderSummary(
@@ -138,7 +150,7 @@ class ShareholderService:
                 full_name=row.full_name,
                 email=row.email,
                 total_shares=int(row.total_shares),
-                total_value=row.total_value,
+                total_value=Decimal(int(row.total_value_cents)).scaleb(-2),
                 issuance_count=int(row.issuance_count)
             )
             for row in shareholders_data
@@ -155,30 +167,33 @@ class ShareholderService:
         Returns:
             Shareholder profile with issuances or None
         """
-        shareholder = self.shareholder_repo.get_by_user_id(user_id)
+        # Profile, issuances and total shares in one lookup plus one IN query
+        shareholder = self.shareholder_repo.get_with_issuances_by_user_id(user_id)
         if not shareholder:
             return None
 
-        # Load issuances for total calculation
-        shareholder_with_issuances = self.shareholder_repo.get_with_issuances(shareholder.id)
+        return ShareholderProfileResponse.model_validate(shareholder)
 
-        return ShareholderProfileResponse.from_orm(shareholder_with_issuances)
-
-    def get_shareholder_details(self, shareholder_id: int) -> Optional[ShareholderProfileResponse]:
+    def get_shareholder_details(self, shareholder_id: int, user_id: int,
+                                user_role: str) -> Optional[ShareholderProfileResponse]:
         """
-        Get detailed shareholder information including all issuances.
+        Get detailed shareholder information with role-based access control.
 
         Args:
             shareholder_id: Shareholder ID
+            user_id: Requesting user ID
+            user_role: User role (admin or shareholder)
 
         Returns:
-            Detailed shareholder profile or None
+            Detailed shareholder profile if authorized, None otherwise
         """
-        shareholder = self.shareholder_repo.get_with_issuances(shareholder_id)
+        # Admin can access all shareholders; shareholders only their own profile
+        owner_id = None if user_role == "admin" else user_id
+        shareholder = self.shareholder_repo.get_with_issuances(shareholder_id, user_id=owner_id)
         if not shareholder:
             return None
 
-        return ShareholderProfileResponse.from_orm(shareholder)
+        return ShareholderProfileResponse.model_validate(shareholder)
 
     def _generate_temporary_password(self, length: int = 12) -> str:
         """
@@ -190,7 +205,13 @@ class ShareholderService:
         Returns:
             Generated password string
         """
-        # Use mix of letters, digits, and symbols for strong password
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-        password = ''.join(secrets.choice(alphabet) for _ in range(length))
-        return password
+        # One random block per password instead of one urandom call per character.
+        # Bytes past the last full multiple of the alphabet size are skipped to avoid modulo bias.
+        password = []
+        while len(password) < length:
+            password.extend(
+                _PASSWORD_ALPHABET[byte % len(_PASSWORD_ALPHABET)]
+                for byte in secrets.token_bytes(2 * length)
+                if byte < _PASSWORD_BYTE_LIMIT
+            )
+        return ''.join(password[:length])
@@ -1,19 +1,35 @@
 # Security utilities following Single Responsibility Principle
 # Each function has one security-related responsibility
 
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from jose import JWTError, jwk, jwt
 from app.config import settings
 
-# Password hashing context using bcrypt for security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing with Argon2id; the parameters are encoded in each hash
+password_hasher = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost_kib,
+    parallelism=settings.argon2_parallelism
+)
+
+# JWT signing key, built once - jose would otherwise re-parse the secret on every encode/decode
+_jwt_key = jwk.construct(settings.secret_key, settings.algorithm)
+_jwt_algorithms = (settings.algorithm,)  # Accepted when verifying
+
+# Hashes made before Argon2id are bcrypt; they are verified and replaced on the next login
+ARGON2_PREFIX = "$argon2"
+BCRYPT_MAX_PASSWORD_BYTES = 72  # bcrypt ignores anything past 72 bytes
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against its hash.
+    Accepts Argon2id hashes and legacy bcrypt hashes.
 
     Args:
         plain_password: Plain text password
@@ -22,12 +38,36 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    if hashed_password.startswith(ARGON2_PREFIX):
+        try:
+            return password_hasher.verify(hashed_password, plain_password)
+        except (VerificationError, InvalidHashError):
+            return False
+    try:
+        return bcrypt.checkpw(plain_password.encode()[:BCRYPT_MAX_PASSWORD_BYTES], hashed_password.encode())
+    except ValueError:  # Not a bcrypt hash either
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash should be replaced: legacy bcrypt hashes,
+    and Argon2 hashes made with parameters other than the configured ones.
+
+    Args:
+        hashed_password: Hashed password from database
+
+    Returns:
+        True if the password should be rehashed after a successful login
+    """
+    if not hashed_password.startswith(ARGON2_PREFIX):
+        return True
+    return password_hasher.check_needs_rehash(hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
-    Hash a plain text password.
+    Hash a plain text password with Argon2id.
 
     Args:
         password: Plain text password
@@ -35,7 +75,21 @@ def get_password_hash(password: str) -> str:
     Returns:
         Hashed password string
     """
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+
+def measure_password_hash_ms() -> float:
+    """
+    Time one password hash with the configured parameters.
+    Login latency is dominated by this, so it is logged at startup to catch
+    slow (e.g. non-SIMD) argon2 builds and mistuned parameters.
+
+    Returns:
+        Milliseconds taken by one hash
+    """
+    start = time.perf_counter()
+    password_hasher.hash("password-hash-timing-probe")
+    return (time.perf_counter() - start) * 1000
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -49,20 +103,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         JWT token string
     """
-    to_encode = data.copy()
-
-    # Set expiration time
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-
-    # Add expiration to payload
-    to_encode.update({"exp": expire})
+    # Set expiration time as the POSIX timestamp the exp claim holds anyway
+    lifetime = expires_delta.total_seconds() if expires_delta else settings.access_token_expire_minutes * 60
+    expire = int(time.time() + lifetime)
 
-    # Create and return JWT token
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    return encoded_jwt
+    # Create and return JWT token - the caller's dict is left untouched
+    return jwt.encode({**data, "exp": expire}, _jwt_key, algorithm=settings.algorithm)
 
 
 def verify_token(token: str) -> Optional[dict]:
@@ -77,13 +123,31 @@ def verify_token(token: str) -> Optional[dict]:
     """
     try:
         # Decode and verify token
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, _jwt_key, algorithms=_jwt_algorithms)
         return payload
     except JWTError:
         # Token is invalid or expired
         return None
 
 
+def get_token_expiry(token: str) -> Optional[float]:
+    """
+    Read the expiration timestamp from a JWT token without verifying it.
+    Only use on tokens that have already been verified.
+
+    Args:
+        token: JWT token string
+
+    Returns:
+        Expiration as a POSIX timestamp, None if absent or unreadable
+    """
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    return float(exp) if exp is not None else None
+
+
 def extract_token_from_header(authorization: str) -> Optional[str]:
     """
     Extract token from Authorization header.
@@ -0,0 +1,68 @@
+"""Store share prices as integer cents
+
+share_issuances.price_per_share NUMERIC(10,2) becomes price_cents BIGINT.
+
+Revision ID: 0001_issuance_price_cents
+Revises:
+Create Date: 2026-10-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_issuance_price_cents"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _issuance_columns():
+    """Column names of share_issuances, or None when the table doesn't exist yet"""
+    if op.get_context().as_sql:
+        return {"price_per_share"}  # Offline SQL is generated for a pre-upgrade schema
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("share_issuances"):
+        return None
+    return {column["name"] for column in inspector.get_columns("share_issuances")}
+
+
+def upgrade() -> None:
+    columns = _issuance_columns()
+    if columns is None or "price_per_share" not in columns:
+        return  # New database - create_all already builds price_cents
+
+    if op.get_context().dialect.name == "postgresql":
+        # One table rewrite: convert in place with a USING cast, then rename
+        op.alter_column(
+            "share_issuances", "price_per_share",
+            type_=sa.BigInteger(),
+            existing_type=sa.Numeric(10, 2),
+            existing_nullable=False,
+            postgresql_using="round(price_per_share * 100)::bigint",
+        )
+        op.alter_column("share_issuances", "price_per_share", new_column_name="price_cents")
+        return
+
+    op.add_column("share_issuances", sa.Column("price_cents", sa.BigInteger(), nullable=True))
+    op.execute("UPDATE share_issuances SET price_cents = CAST(ROUND(price_per_share * 100) AS BIGINT)")
+    with op.batch_alter_table("share_issuances") as batch_op:
+        batch_op.alter_column("price_cents", existing_type=sa.BigInteger(), nullable=False)
+        batch_op.drop_column("price_per_share")
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        op.alter_column("share_issuances", "price_cents", new_column_name="price_per_share")
+        op.alter_column(
+            "share_issuances", "price_per_share",
+            type_=sa.Numeric(10, 2),
+            existing_type=sa.BigInteger(),
+            existing_nullable=False,
+            postgresql_using="price_per_share / 100.0",
+        )
+        return
+
+    op.add_column("share_issuances", sa.Column("price_per_share", sa.Numeric(10, 2), nullable=True))
+    op.execute("UPDATE share_issuances SET price_per_share = price_cents / 100.0")
+    with op.batch_alter_table("share_issuances") as batch_op:
+        batch_op.alter_column("price_per_share", existing_type=sa.Numeric(10, 2), nullable=False)
+        batch_op.drop_column("price_cents")
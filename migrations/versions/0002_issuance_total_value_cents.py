@@ -0,0 +1,55 @@
+"""Store issuance total value as a generated column
+
+Adds share_issuances.total_value_cents GENERATED ALWAYS AS (number_of_shares * price_cents) STORED
+and rebuilds ix_issuance_holder_date so per-shareholder totals aggregate from the index alone.
+
+Revision ID: 0002_issuance_total_value_cents
+Revises: 0001_issuance_price_cents
+Create Date: 2026-10-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_issuance_total_value_cents"
+down_revision = "0001_issuance_price_cents"
+branch_labels = None
+depends_on = None
+
+
+def _issuance_columns():
+    """Column names of share_issuances, or None when the table doesn't exist yet"""
+    if op.get_context().as_sql:
+        return {"price_cents"}  # Offline SQL is generated for a pre-upgrade schema
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("share_issuances"):
+        return None
+    return {column["name"] for column in inspector.get_columns("share_issuances")}
+
+
+def upgrade() -> None:
+    columns = _issuance_columns()
+    if columns is None or "total_value_cents" in columns:
+        return  # New database - create_all already builds the column and index
+
+    total_value_cents = sa.Column(
+        "total_value_cents", sa.BigInteger(), sa.Computed("number_of_shares * price_cents", persisted=True)
+    )
+    # SQLite can only ADD stored generated columns by rebuilding the table
+    recreate = "always" if op.get_context().dialect.name == "sqlite" else "auto"
+    with op.batch_alter_table("share_issuances", recreate=recreate) as batch_op:
+        batch_op.add_column(total_value_cents)
+
+    # The standalone shareholder_id index is a prefix of ix_issuance_holder_date
+    op.drop_index("ix_share_issuances_shareholder_id", table_name="share_issuances", if_exists=True)
+    op.drop_index("ix_issuance_holder_date", table_name="share_issuances", if_exists=True)
+    op.create_index(
+        "ix_issuance_holder_date", "share_issuances", ["shareholder_id", "issued_date"],
+        postgresql_include=["number_of_shares", "total_value_cents"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_issuance_holder_date", table_name="share_issuances")
+    op.create_index("ix_issuance_holder_date", "share_issuances", ["shareholder_id", "issued_date"])
+    with op.batch_alter_table("share_issuances") as batch_op:
+        batch_op.drop_column("total_value_cents")
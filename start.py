@@ -1,8 +1,12 @@
 # start.py
+import importlib.util
 import sys
 import subprocess
 import os
 
+# Packages the server needs; probed without importing them
+REQUIRED_MODULES = ("fastapi", "sqlalchemy", "uvicorn")
+
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -14,6 +18,11 @@ def check_python_version():
     return True
 
 
+def dependencies_installed():
+    """Check that required packages are installed, without paying for their import"""
+    return all(importlib.util.find_spec(name) is not None for name in REQUIRED_MODULES)
+
+
 def install_dependencies():
     """Install required dependencies"""
     print("📦 Installing dependencies...")
@@ -32,11 +41,16 @@ def start_server():
     try:
         # Import here to avoid early import issues
         import uvicorn
+
+        # Auto-reload (file watcher + extra process) only when asked for with DEV=1;
+        # uvicorn[standard] picks uvloop and httptools automatically when available
+        reload = os.getenv("DEV") == "1"
         uvicorn.run(
             "app.main:app",
             host="0.0.0.0",
             port=8000,
-            reload=True,
+            reload=reload,
+            workers=None if reload else int(os.getenv("WORKERS", "1")),
             log_level="info"
         )
     except ImportError as e:
@@ -56,14 +70,9 @@ if __name__ == "__main__":
         sys.exit(1)
 
     # Check if we need to install dependencies
-    try:
-        import fastapi
-        import sqlalchemy
-        import uvicorn
-
+    if dependencies_installed():
         print("✅ Dependencies already installed")
-    except ImportError:
-        if not install_dependencies():
-            sys.exit(1)
+    elif not install_dependencies():
+        sys.exit(1)
 
     start_server()
\ No newline at end of file
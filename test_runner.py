@@ -7,8 +7,13 @@ import os
 import subprocess
 from pathlib import Path
 
-def check_project_structure():
-    """Check and display project structure"""
+# Same cheap password hashing as tests/basic_tests.py - the app is imported here first,
+# and pytest then runs in this process against the already-loaded settings
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST_KIB", "1024")
+
+def check_project_structure(verbose=False):
+    """Check project structure; directory contents are listed only when something is missing or verbose is set"""
     print("🔍 Checking project structure...")
     print("-" * 40)
     
@@ -24,21 +29,29 @@ def check_project_structure():
         "requirements.txt"
     ]
     
+    missing = False
     for item in key_items:
         path = current_dir / item
         if path.exists():
             print(f"✅ {item} - exists")
         else:
             print(f"❌ {item} - missing")
+            missing = True
+    
+    if not (missing or verbose):
+        return
     
+    # scandir entries carry their file type, so no extra stat() per entry
     print(f"\nContents of current directory:")
-    for item in current_dir.iterdir():
-        print(f"  - {item.name} {'(dir)' if item.is_dir() else '(file)'}")
+    with os.scandir(current_dir) as entries:
+        for entry in entries:
+            print(f"  - {entry.name} {'(dir)' if entry.is_dir() else '(file)'}")
     
     if (current_dir / "app").exists():
         print(f"\nContents of app/ directory:")
-        for item in (current_dir / "app").iterdir():
-            print(f"  - {item.name}")
+        with os.scandir(current_dir / "app") as entries:
+            for entry in entries:
+                print(f"  - {entry.name}")
 
 def run_direct_import_test():
     """Test direct import without pytest"""
@@ -106,21 +119,23 @@ def run_pytest_tests():
             print(f"❌ Test file not found: {test_file}")
             return False
         
-        # Run pytest
-        cmd = [
-            sys.executable, "-m", "pytest", 
-            str(test_file),
-            "-v", "-s", "--tb=short"
-        ]
-        
-        print(f"Running: {' '.join(cmd)}")
-        result = subprocess.run(cmd, cwd=current_dir, timeout=60)
+        # Run pytest in this process, reusing the app modules imported by the direct import test
+        args = [str(test_file), "-v", "-s", "--tb=short"]
+        try:
+            import pytest
+            print(f"Running: pytest {' '.join(args)}")
+            returncode = pytest.main(args)
+        except Exception as e:
+            print(f"⚠️  In-process pytest failed ({e}), retrying in a subprocess")
+            cmd = [sys.executable, "-m", "pytest", *args]
+            print(f"Running: {' '.join(cmd)}")
+            returncode = subprocess.run(cmd, cwd=current_dir, timeout=60).returncode
         
-        if result.returncode == 0:
+        if returncode == 0:
             print("✅ Pytest tests passed!")
             return True
         else:
-            print(f"❌ Pytest tests failed with code {result.returncode}")
+            print(f"❌ Pytest tests failed with code {returncode}")
             return False
             
     except subprocess.TimeoutExpired:
@@ -136,7 +151,7 @@ def main():
     print("=" * 50)
     
     # Step 1: Check project structure
-    check_project_structure()
+    check_project_structure(verbose="--verbose" in sys.argv)
     
     # Step 2: Test direct imports
     import_ok = run_direct_import_test()
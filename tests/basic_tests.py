@@ -1,6 +1,7 @@
 """
 Comprehensive tests covering key Cap Table Management System features
 """
+import os
 import sys
 from pathlib import Path
 
@@ -11,10 +12,22 @@ current_dir = Path(__file__).parent
 project_root = current_dir.parent
 sys.path.insert(0, str(project_root))
 
+# Cheap password hashing for tests - must be set before app.config is imported
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST_KIB", "1024")
+
 print(f"Current directory: {current_dir}")
 print(f"Project root: {project_root}")
 
 
+@pytest.fixture(scope="session")
+def client():
+    """One test client shared by every endpoint test, instead of one per test"""
+    from app.main import app
+
+    return TestClient(app)
+
+
 def test_app_import():
     print("Testing app import...")
     try:
@@ -37,11 +50,8 @@ def test_basic_client():
         pytest.fail(f"Basic client test failed: {e}")
 
 
-def test_health_endpoint():
+def test_health_endpoint(client):
     print("Testing health endpoint...")
-    from app.main import app
-
-    client = TestClient(app)
     response = client.get("/health")
 
     print(f"Health check status: {response.status_code}")
@@ -56,10 +66,7 @@ def test_health_endpoint():
     print("✅ Health endpoint working correctly")
 
 
-def test_root_endpoint():
-    from app.main import app
-
-    client = TestClient(app)
+def test_root_endpoint(client):
     response = client.get("/")
 
     print(f"Root endpoint status: {response.status_code}")
@@ -71,11 +78,7 @@ def test_root_endpoint():
     print("✅ Root endpoint working correctly")
 
 
-def test_openapi_docs_accessible():
-    from app.main import app
-
-    client = TestClient(app)
-
+def test_openapi_docs_accessible(client):
     response = client.get("/openapi.json")
     assert response.status_code == 200
 
@@ -95,12 +98,8 @@ def test_openapi_docs_accessible():
 
 # AUTHENTICATION TESTS (WITHOUT DATABASE)
 
-def test_auth_endpoints_exist():
+def test_auth_endpoints_exist(client):
     """Test authentication endpoints are available"""
-    from app.main import app
-
-    client = TestClient(app)
-
     response = client.post("/api/token", json={
         "email": "test@example.com",
         "password": "testpassword"
@@ -110,16 +109,13 @@ def test_auth_endpoints_exist():
     print(f"Auth endpoint exists (status: {response.status_code})")
 
 
-def test_protected_endpoints_require_auth():
+def test_protected_endpoints_require_auth(client):
     """Test that protected endpoints require authentication"""
-    from app.main import app
-
-    client = TestClient(app)
-
     # Test protected endpoints without auth token
     protected_endpoints = [
         ("GET", "/api/shareholders/"),
-        ("GET", "/api/issuances/")
+        ("GET", "/api/issuances/"),
+        ("POST", "/api/issuances/bulk")
     ]
 
     for method, endpoint in protected_endpoints:
@@ -182,6 +178,175 @@ def test_shareholder_models_import():
         pytest.fail(f"Cannot import shareholder models: {e}")
 
 
+def test_issuance_price_stored_in_cents():
+    """Test that issuance prices round-trip exactly through integer cents"""
+    from decimal import Decimal
+
+    from app.models.shareholder import ShareIssuance
+
+    issuance = ShareIssuance(number_of_shares=3, price_per_share=Decimal("1.50"))
+
+    assert issuance.price_cents == 150
+    assert issuance.price_per_share == Decimal("1.50")
+    assert str(issuance.total_value) == "4.50"
+
+    with pytest.raises(ValueError):
+        ShareIssuance(number_of_shares=1, price_per_share=Decimal("1.005"))
+    print("✅ Issuance prices stored as exact cents")
+
+
+def test_migrations_upgrade_decimal_prices(tmp_path):
+    """Test that the Alembic migrations convert a pre-cents share_issuances table"""
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import create_engine, inspect, text
+
+    url = f"sqlite:///{tmp_path / 'upgrade.db'}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        # share_issuances as create_all built it before prices moved to cents
+        connection.execute(text(
+            "CREATE TABLE share_issuances (id INTEGER NOT NULL PRIMARY KEY, shareholder_id INTEGER NOT NULL, "
+            "number_of_shares INTEGER NOT NULL, price_per_share NUMERIC(10, 2) NOT NULL, issued_date DATETIME, "
+            "certificate_number VARCHAR(50) NOT NULL, notes TEXT, created_at DATETIME)"
+        ))
+        connection.execute(text("CREATE INDEX ix_share_issuances_shareholder_id ON share_issuances (shareholder_id)"))
+        connection.execute(text(
+            "INSERT INTO share_issuances (shareholder_id, number_of_shares, price_per_share, certificate_number) "
+            "VALUES (1, 10, 1.50, 'CERT-2026-000001'), (1, 3, 0.07, 'CERT-2026-000002')"
+        ))
+
+    config = Config()
+    config.set_main_option("script_location", str(project_root / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+    columns = {column["name"] for column in inspect(engine).get_columns("share_issuances")}
+    assert "price_cents" in columns and "price_per_share" not in columns
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT price_cents, total_value_cents FROM share_issuances ORDER BY id")).all()
+    assert [tuple(row) for row in rows] == [(150, 1500), (7, 21)]
+    assert "ix_issuance_holder_date" in {index["name"] for index in inspect(engine).get_indexes("share_issuances")}
+    engine.dispose()
+    print("✅ Migrations convert decimal prices to cents")
+
+
+def test_certificate_counter_continues_existing_certificates():
+    """Test that certificate numbering resumes after certificates issued before the counter table"""
+    from datetime import datetime
+    from decimal import Decimal
+
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.database import Base
+    from app.main import app  # noqa: F401 - registers every model on Base
+    from app.models.shareholder import ShareIssuance
+    from app.repositories.shareholder import ShareIssuanceRepository
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    year = datetime.now().year
+
+    with Session(engine) as db:
+        # Issued by the old max()-scan numbering, before cert_counters existed
+        db.execute(insert(ShareIssuance).values(
+            shareholder_id=1, number_of_shares=10, price_cents=100, issued_date=datetime.now(),
+            certificate_number=f"CERT-{year}-000001"
+        ))
+        db.commit()
+
+        repo = ShareIssuanceRepository(db)
+        assert repo.backfill_certificate_counters()
+        assert not repo.backfill_certificate_counters()
+
+        certificate_number = repo.generate_certificate_number()
+        assert certificate_number == f"CERT-{year}-000002"
+        repo.create({"shareholder_id": 1, "number_of_shares": 5, "price_per_share": Decimal("2.00"),
+                     "certificate_number": certificate_number})
+    print("✅ Certificate counter continues existing certificates")
+
+
+def test_business_audit_events_share_the_transaction():
+    """Test that shareholder and issuance audit events are committed with the records they describe"""
+    from decimal import Decimal
+
+    from sqlalchemy import create_engine, event, select
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.database import Base
+    from app.main import app  # noqa: F401 - registers every model on Base
+    from app.models.audit import AuditEvent
+    from app.schemas.shareholder import ShareholderProfileCreate, ShareIssuanceCreate
+    from app.services.issuance import ShareIssuanceService
+    from app.services.shareholder import ShareholderService
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        commits = []
+        event.listen(db, "after_commit", commits.append)
+
+        shareholder = ShareholderService(db).create_shareholder(
+            ShareholderProfileCreate(email="holder@example.com", full_name="Jane Holder"), created_by_user_id=1
+        )
+        ShareIssuanceService(db).create_share_issuance(
+            ShareIssuanceCreate(shareholder_id=shareholder.id, number_of_shares=100,
+                                price_per_share=Decimal("1.50")),
+            issued_by_user_id=1
+        )
+
+        assert len(commits) == 2
+        event_types = db.scalars(select(AuditEvent.event_type).order_by(AuditEvent.id)).all()
+        assert event_types == ["shareholder_created", "share_issuance"]
+    print("✅ Business audit events share the transaction")
+
+
+def test_audit_queue_batches_and_flushes_on_stop(monkeypatch):
+    """Test that queued audit events are written in batches and flushed on stop"""
+    from app.services.audit_queue import AuditEventQueue
+
+    batches = []
+    queue = AuditEventQueue(max_size=10, batch_size=2, flush_interval=60)
+    monkeypatch.setattr(queue, "_write", batches.append)
+
+    for event_type in ("dashboard_access", "dashboard_access", "certificate_download"):
+        queue.enqueue({"event_type": event_type})
+    queue.stop()
+
+    assert [len(batch) for batch in batches] == [2, 1]
+
+    # Late events after shutdown are written inline instead of restarting the writer
+    queue.enqueue({"event_type": "login_success"})
+    assert queue._thread is None
+    assert [len(batch) for batch in batches] == [2, 1, 1]
+    print("✅ Audit queue batches events and flushes on stop")
+
+
+def test_failed_login_audited_synchronously(monkeypatch):
+    """Test that failed logins are written inline rather than through the lossy audit queue"""
+    from fastapi import HTTPException
+
+    from app.schemas.user import UserLogin
+    from app.services import auth
+
+    written, queued = [], []
+    monkeypatch.setattr(auth.UserRepository, "authenticate_user", lambda self, email, password: None)
+    monkeypatch.setattr(auth.AuditRepository, "create_events_bulk", lambda self, events: written.extend(events))
+    monkeypatch.setattr(auth.audit_queue, "enqueue", queued.append)
+
+    with pytest.raises(HTTPException) as exc_info:
+        auth.AuthService(db=None).authenticate_user(UserLogin(email="x@example.com", password="wrong-password"))
+
+    assert exc_info.value.status_code == 401
+    assert [event["event_type"] for event in written] == ["login_failed"]
+    assert queued == []
+    print("✅ Failed logins audited synchronously")
+
+
 def test_audit_models_import():
     """Test audit model imports"""
     try:
@@ -261,6 +426,162 @@ def test_security_utils_import():
         print(f"⚠️  Security utils not fully available: {e}")
 
 
+def test_password_hashing_migrates_bcrypt():
+    """Test Argon2id hashing, and that legacy bcrypt hashes verify but are flagged for rehash"""
+    import bcrypt
+    from app.utils.security import get_password_hash, password_needs_rehash, verify_password
+
+    hashed = get_password_hash("s3cret-pass")
+    assert hashed.startswith("$argon2id$")
+    assert verify_password("s3cret-pass", hashed)
+    assert not verify_password("wrong-pass", hashed)
+    assert not password_needs_rehash(hashed)
+
+    legacy = bcrypt.hashpw(b"s3cret-pass", bcrypt.gensalt(rounds=4)).decode()
+    assert verify_password("s3cret-pass", legacy)
+    assert not verify_password("wrong-pass", legacy)
+    assert password_needs_rehash(legacy)
+
+    print("✅ Argon2id hashing works and bcrypt hashes are migrated")
+
+
+def test_client_ip_header_precedence():
+    """Test client IP extraction from proxy headers"""
+    from starlette.requests import Request
+
+    from app.api.deps import get_client_ip
+
+    def make_request(headers):
+        return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 1234)})
+
+    assert get_client_ip(make_request([])) == "10.0.0.1"
+    assert get_client_ip(make_request([(b"x-real-ip", b"10.0.0.2")])) == "10.0.0.2"
+    assert get_client_ip(make_request([
+        (b"x-real-ip", b"10.0.0.2"),
+        (b"x-forwarded-for", b" 10.0.0.3 , 10.0.0.4"),
+    ])) == "10.0.0.3"
+    print("✅ Client IP extraction working correctly")
+
+
+def test_token_cache_skips_repeat_validation(monkeypatch):
+    """Test that a validated token is served from cache on the next request"""
+    from fastapi.security import HTTPAuthorizationCredentials
+    from starlette.requests import Request
+
+    from app.api import deps
+    from app.utils.security import create_access_token
+
+    calls = []
+
+    def fake_get_current_user_from_token(self, token):
+        calls.append(token)
+        return {"id": 1, "email": "test@example.com", "role": "admin", "is_active": True}
+
+    monkeypatch.setattr(deps.AuthService, "get_current_user_from_token", fake_get_current_user_from_token)
+    deps._token_cache.clear()
+
+    token = create_access_token({"sub": "test@example.com"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    request = Request({"type": "http", "headers": [], "client": ("10.0.0.1", 1234)})
+
+    first = deps.get_current_user(request, credentials, db=None)
+    second = deps.get_current_user(request, credentials, db=None)
+
+    assert len(calls) == 1
+    assert first == second
+    assert second["ip_address"] == "10.0.0.1"
+    assert token.encode() not in deps._token_cache
+    print("✅ Token cache avoids repeated validation")
+
+
+def test_user_cache_shared_across_tokens(monkeypatch):
+    """Test that tokens of the same user share one user lookup"""
+    from types import SimpleNamespace
+
+    from app.models.user import UserRole
+    from app.services import auth
+    from app.utils.security import create_access_token
+
+    lookups = []
+
+    def fake_get_by_email(self, email):
+        lookups.append(email)
+        return SimpleNamespace(id=7, email=email, role=UserRole.ADMIN, is_active=True)
+
+    monkeypatch.setattr(auth.UserRepository, "get_by_email", fake_get_by_email)
+    auth._user_cache.pop("cached@example.com", None)
+
+    service = auth.AuthService(db=None)
+    first = service.get_current_user_from_token(create_access_token({"sub": "cached@example.com", "n": 1}))
+    second = service.get_current_user_from_token(create_access_token({"sub": "cached@example.com", "n": 2}))
+
+    assert lookups == ["cached@example.com"]
+    assert first == second and first["id"] == 7
+
+    auth._user_cache.pop("cached@example.com", None)
+    service.get_current_user_from_token(create_access_token({"sub": "cached@example.com"}))
+    assert len(lookups) == 2
+    print("✅ User cache shared across tokens")
+
+
+def test_database_outage_returns_retryable_503(monkeypatch):
+    """Test that a lost database connection surfaces as 503 rather than 401"""
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+    from sqlalchemy.exc import OperationalError
+    from starlette.requests import Request
+
+    from app.api import deps
+    from app.utils.security import create_access_token
+
+    def failing_get_current_user_from_token(self, token):
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(deps.AuthService, "get_current_user_from_token", failing_get_current_user_from_token)
+    deps._token_cache.clear()
+
+    token = create_access_token({"sub": "outage@example.com"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    request = Request({"type": "http", "headers": [], "client": ("10.0.0.1", 1234)})
+
+    with pytest.raises(HTTPException) as exc_info:
+        deps.get_current_user(request, credentials, db=None)
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+    print("✅ Database outage reported as retryable 503")
+
+
+def test_issuance_etag_matching(monkeypatch):
+    """Test If-None-Match handling for cacheable issuance responses"""
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+
+    from starlette.requests import Request
+
+    from app.api import issuances
+    from app.api.issuances import _etag_matches
+
+    def make_request(if_none_match):
+        headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+        return Request({"type": "http", "headers": headers})
+
+    etag = 'W/"3-1700000000"'
+    assert _etag_matches(make_request(etag), etag)
+    assert _etag_matches(make_request('"other", "3-1700000000"'), etag)
+    assert _etag_matches(make_request("*"), etag)
+    assert not _etag_matches(make_request('W/"4-1700000000"'), etag)
+    assert not _etag_matches(make_request(None), etag)
+
+    # Certificate validators change with the template version, unlike the issuance's own
+    issuance = SimpleNamespace(id=3, created_at=datetime.fromtimestamp(1700000000, timezone.utc))
+    monkeypatch.setattr(issuances, "CERTIFICATE_TEMPLATE_VERSION", 2)
+    assert issuances._issuance_etag(issuance) == etag
+    assert issuances._certificate_etag(issuance) == 'W/"3-1700000000-v2"'
+    assert not _etag_matches(make_request('W/"3-1700000000-v1"'), issuances._certificate_etag(issuance))
+    print("✅ Issuance ETag matching working correctly")
+
+
 def test_certificate_utils_import():
     """Test certificate generation utilities"""
     try:
@@ -307,11 +628,8 @@ def test_cors_configuration():
 
 
 # ERROR HANDLING TESTS
-def test_404_handling():
+def test_404_handling(client):
     """Test 404 error handling"""
-    from app.main import app
-
-    client = TestClient(app)
     response = client.get("/nonexistent/endpoint")
 
     assert response.status_code == 404
@@ -325,12 +643,8 @@ def test_404_handling():
         print("✅ 404 errors handled (non-JSON response)")
 
 
-def test_method_not_allowed_handling():
+def test_method_not_allowed_handling(client):
     """Test 405 Method Not Allowed handling"""
-    from app.main import app
-
-    client = TestClient(app)
-
     # Try POST on a GET-only endpoint
     response = client.post("/health")
 